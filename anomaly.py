@@ -0,0 +1,301 @@
+"""Anomaly detection on realisasi postings.
+
+Each posting is scored against the running statistics of its
+(Jenis Belanja, Triwulan) series: its absorption (Realisasi / Anggaran, in
+percent) is compared with the mean and standard deviation of the postings
+in the same series with an earlier ``Tanggal``. Postings on the same date
+(every quarter's postings share the quarter-end date) never score against
+each other, so the result does not depend on row order. A posting is
+flagged when
+
+* its absorption is more than ``Z_THRESHOLD`` standard deviations above the
+  series mean, once the series has ``MIN_HISTORY`` earlier postings, or
+* Realisasi exceeds Anggaran (negative Sisa Anggaran).
+
+:class:`AnomalyDetector` scores records one at a time as they arrive in
+``Tanggal`` order (O(1) per record, Welford updates); :func:`score_frame`
+scores a whole history at once, vectorised, with the same result.
+:func:`flagged_sql` gets the same flags from window aggregates inside the
+database of a SQL backend, and :class:`LiveFlags` keeps the flags of a
+growing dataset current by scoring only the postings added since the last
+snapshot.
+"""
+import copy
+import hashlib
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+Z_THRESHOLD = float(os.environ.get("REALISASI_ANOMALY_Z", "3"))
+MIN_HISTORY = int(os.environ.get("REALISASI_ANOMALY_MIN_HISTORY", "5"))
+
+KEY = ['Jenis Belanja', 'Triwulan']
+SCORE_COLUMNS = ['Serapan (%)', 'Z-Score', 'Anomali', 'Alasan']
+CONTEXT_COLUMNS = [
+    'Tanggal', 'Tahun', 'Triwulan', 'Kode Belanja', 'Uraian Belanja', 'Jenis Belanja',
+    'Anggaran', 'Realisasi', 'Sisa Anggaran',
+]
+
+OVER_BUDGET = "Realisasi > Anggaran"
+SPIKE = "Serapan jauh di atas pola triwulan"
+
+
+def _reason(over, spike):
+    if over and spike:
+        return f"{OVER_BUDGET}; {SPIKE}"
+    return OVER_BUDGET if over else SPIKE if spike else ""
+
+
+def _merge(a, b):
+    """(count, mean, M2) of two sets of values combined (Chan et al.)."""
+    n = a[0] + b[0]
+    if n == 0:
+        return [0, 0.0, 0.0]
+    delta = b[1] - a[1]
+    return [n, a[1] + delta * b[0] / n, a[2] + b[2] + delta * delta * a[0] * b[0] / n]
+
+
+class AnomalyDetector:
+    """Streaming scorer keeping (count, mean, M2) per series.
+
+    ``stats`` holds the dates already closed; the postings of a series'
+    latest date wait in ``pending`` (with that date) and join ``stats`` once
+    a later date arrives.
+    """
+
+    def __init__(self, z_threshold=Z_THRESHOLD, min_history=MIN_HISTORY):
+        self.z_threshold = z_threshold
+        self.min_history = min_history
+        self.stats = {}
+        self.pending = {}
+
+    @classmethod
+    def from_history(cls, df, **kwargs):
+        """Seed the running statistics from already ingested rows."""
+        detector = cls(**kwargs)
+        serapan = df['Realisasi'] / df['Anggaran'].where(df['Anggaran'] > 0) * 100
+        valid = serapan.notna()
+        by = [df.loc[valid, k] for k in [*KEY, 'Tanggal']]
+        daily = serapan[valid].groupby(by, observed=True, sort=True).agg(['count', 'mean', 'var'])
+        for index, (n, mean, var) in daily.iterrows():
+            key, tanggal, n = index[:-1], index[-1], int(n)
+            day = [n, float(mean), float(var) * (n - 1) if n > 1 else 0.0]
+            # Days arrive sorted per series: the previous latest day is closed
+            if key in detector.pending:
+                detector.stats[key] = _merge(detector.stats.get(key, [0, 0.0, 0.0]), detector.pending[key][1])
+            detector.pending[key] = [tanggal, day]
+        return detector
+
+    def score(self, record):
+        """Score one record against the earlier dates of its series, then add it to the series."""
+        anggaran, realisasi = record['Anggaran'], record['Realisasi']
+        serapan = realisasi / anggaran * 100 if anggaran > 0 else math.nan
+        z = math.nan
+        if not math.isnan(serapan):
+            key, tanggal = tuple(record[k] for k in KEY), record['Tanggal']
+            pending = self.pending.get(key)
+            if pending is not None and tanggal > pending[0]:
+                self.stats[key] = _merge(self.stats.get(key, [0, 0.0, 0.0]), pending[1])
+                pending = None
+            n, mean, m2 = self.stats.get(key, [0, 0.0, 0.0])
+            if n >= self.min_history and n > 1:
+                std = math.sqrt(m2 / (n - 1))
+                if std > 0:
+                    z = (serapan - mean) / std
+            if pending is None:
+                pending = self.pending[key] = [tanggal, [0, 0.0, 0.0]]
+            day = pending[1]
+            day[0] += 1
+            delta = serapan - day[1]
+            day[1] += delta / day[0]
+            day[2] += delta * (serapan - day[1])
+
+        over = realisasi > anggaran
+        spike = z > self.z_threshold
+        return {
+            'Serapan (%)': serapan,
+            'Z-Score': z,
+            'Anomali': bool(over or spike),
+            'Alasan': _reason(over, spike),
+        }
+
+
+def score_frame(df, z_threshold=Z_THRESHOLD, min_history=MIN_HISTORY):
+    """Score every row of ``df`` against the earlier dates of its series.
+
+    Returns the ``SCORE_COLUMNS`` aligned to ``df.index``.
+    """
+    serapan = df['Realisasi'] / df['Anggaran'].where(df['Anggaran'] > 0) * 100
+    valid = serapan.notna()
+
+    # Totals per (series, date), then prefix sums over each series' dates
+    history = serapan[valid]
+    days = pd.DataFrame({'s': history, 'sq': history ** 2}).groupby(
+        [df.loc[valid, k] for k in [*KEY, 'Tanggal']], observed=True, sort=True
+    )
+    daily = days.agg(n=('s', 'count'), total=('s', 'sum'), total_sq=('sq', 'sum'))
+    before = daily.groupby(level=list(range(len(KEY))), observed=True).cumsum() - daily
+    # Each row takes the totals of the dates before its own
+    at = days.ngroup().to_numpy()
+    n, total, total_sq = (pd.Series(before[c].to_numpy()[at], index=history.index) for c in before.columns)
+    mean = total / n.where(n > 0)
+    var = (total_sq - n * mean ** 2) / (n - 1).where(n > 1)
+    std = np.sqrt(var.clip(lower=0))
+    z = ((history - mean) / std.where(std > 0)).where(n >= max(min_history, 2))
+    z = z.reindex(df.index)
+
+    over = (df['Realisasi'] > df['Anggaran']).to_numpy()
+    spike = (z > z_threshold).to_numpy()
+    # Object array: np.where on strings would allocate a wide unicode array per row
+    reason = np.full(len(df), "", dtype=object)
+    reason[over] = OVER_BUDGET
+    reason[spike] = SPIKE
+    reason[over & spike] = f"{OVER_BUDGET}; {SPIKE}"
+    return pd.DataFrame({
+        'Serapan (%)': serapan,
+        'Z-Score': z,
+        'Anomali': over | spike,
+        'Alasan': reason,
+    }, index=df.index)
+
+
+def flagged(df, **kwargs):
+    """The anomalous rows of ``df`` with their scores, newest first."""
+    scores = score_frame(df, **kwargs)
+    rows = df.loc[scores['Anomali'], [c for c in CONTEXT_COLUMNS if c in df.columns]]
+    rows = pd.concat([rows, scores.loc[scores['Anomali'], ['Serapan (%)', 'Z-Score', 'Alasan']]], axis=1)
+    return rows.sort_values('Tanggal', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def _flag_scores(rows, z, z_threshold):
+    """``rows`` with the flagged-row score columns, given their absorption 's'."""
+    over = (rows['Realisasi'] > rows['Anggaran']).to_numpy()
+    spike = (z > z_threshold).to_numpy()
+    reason = np.full(len(rows), "", dtype=object)
+    reason[over] = OVER_BUDGET
+    reason[spike] = SPIKE
+    reason[over & spike] = f"{OVER_BUDGET}; {SPIKE}"
+    return rows.assign(**{'Serapan (%)': rows.pop('s'), 'Z-Score': z, 'Alasan': reason})
+
+
+def flagged_sql(backend, z_threshold=Z_THRESHOLD, min_history=MIN_HISTORY):
+    """:func:`flagged` computed by the database behind a SQL backend.
+
+    Window aggregates over each series up to and including a row's date,
+    minus those over its own date, give the count, sum and sum of squares of
+    the earlier dates that :func:`score_frame` builds with prefix sums; only
+    flagged rows come back (in the backend's scan order within a date).
+    """
+    q = backend.quote
+    source, params, order = backend.scan()
+    context = [c for c in CONTEXT_COLUMNS if c in backend.columns]
+    series = ', '.join(q(k) for k in KEY)
+    # The default RANGE frame ends with the row's last peer: its whole date
+    through = f"OVER (PARTITION BY {series} ORDER BY {q('Tanggal')})"
+    same_day = f"OVER (PARTITION BY {series}, {q('Tanggal')})"
+    serapan = f"CASE WHEN {q('Anggaran')} > 0 THEN {q('Realisasi')} * 1.0 / {q('Anggaran')} * 100 END"
+    columns = ', '.join(q(c) for c in context + [c for c in order if c not in context])
+    earlier = (
+        f"COUNT(s) {through} - COUNT(s) {same_day} AS n, "
+        f"COALESCE(SUM(s) {through}, 0) - COALESCE(SUM(s) {same_day}, 0) AS total, "
+        f"COALESCE(SUM(s * s) {through}, 0) - COALESCE(SUM(s * s) {same_day}, 0) AS sq"
+    )
+    scored = (
+        f"SELECT *, total / NULLIF(n, 0) AS mean FROM ("
+        f"SELECT {columns}, s, {earlier} FROM (SELECT *, {serapan} AS s FROM {source}) scan) totals"
+    )
+    # z > threshold without sqrt: compare squares, minding the signs
+    dev, m2, t2 = "(s - mean)", "(sq - n * mean * mean)", repr(float(z_threshold) ** 2)
+    if z_threshold >= 0:
+        spike = f"{dev} > 0 AND {dev} * {dev} * (n - 1) > {t2} * {m2}"
+    else:
+        spike = f"({dev} >= 0 OR {dev} * {dev} * (n - 1) < {t2} * {m2})"
+    rest = ''.join(f", {q(c)}" for c in order[1:])
+    sql = (
+        f"SELECT * FROM ({scored}) scored WHERE {q('Realisasi')} > {q('Anggaran')} "
+        f"OR (n >= {max(int(min_history), 2)} AND {m2} > 0 AND {spike}) "
+        f"ORDER BY {q('Tanggal')} DESC{rest}"
+    )
+    rows = backend.query(sql, params)
+
+    n, mean = rows.pop('n'), rows.pop('mean')
+    rows.pop('total')
+    var = (rows.pop('sq') - n * mean ** 2) / (n - 1).where(n > 1)
+    std = np.sqrt(var.clip(lower=0))
+    z = ((rows['s'] - mean) / std.where(std > 0)).where(n >= max(min_history, 2))
+    rows = _flag_scores(rows[context + ['s']], z, z_threshold)
+    return rows.reset_index(drop=True)
+
+
+def flag_backend(backend, **kwargs):
+    """:func:`flagged` over the full dataset behind a query backend.
+
+    Precomputed with a shared build (``anomalies``), scored in the database by
+    SQL backends (``scan``) and in pandas otherwise.
+    """
+    if getattr(backend, 'anomalies', None) is not None:
+        return backend.anomalies
+    if hasattr(backend, 'scan'):
+        return flagged_sql(backend, **kwargs)
+    return flagged(backend.select(columns=[c for c in CONTEXT_COLUMNS if c in backend.columns]), **kwargs)
+
+
+class LiveFlags:
+    """:func:`flag_backend` for successive snapshots of a growing dataset.
+
+    Meant as a ``LiveDataset`` derive function. The first in-memory snapshot
+    is scored in one batch and seeds an :class:`AnomalyDetector` with
+    :meth:`~AnomalyDetector.from_history`. When a later snapshot's rows up to
+    the last scored ``Tanggal`` are unchanged, only the postings after it are
+    scored, one at a time through the detector; any other change rescores
+    everything. SQL and shared backends score elsewhere and go straight to
+    :func:`flag_backend`.
+    """
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.detector = None
+        self.rows = None
+        self.seen = None
+
+    @staticmethod
+    def _fingerprint(df, columns):
+        hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+        return df['Tanggal'].max(), len(df), hashlib.sha1(hashes.tobytes()).hexdigest()
+
+    def __call__(self, backend):
+        df = getattr(backend, 'df', None)
+        if df is None or getattr(backend, 'anomalies', None) is not None:
+            self.detector = None
+            return flag_backend(backend, **self.kwargs)
+
+        context = [c for c in CONTEXT_COLUMNS if c in df.columns]
+        if self.detector is not None and len(df):
+            history = df[df['Tanggal'] <= self.seen[0]]
+            if self._fingerprint(history, context) == self.seen:
+                return self._extend(df, df[df['Tanggal'] > self.seen[0]], context)
+
+        self.rows = flagged(df[context], **self.kwargs)
+        self.detector = AnomalyDetector.from_history(df, **self.kwargs)
+        self.seen = self._fingerprint(df, context)
+        return self.rows
+
+    def _extend(self, df, new, context):
+        if new.empty:
+            return self.rows
+        new = new.sort_values('Tanggal', kind='stable')
+        # Committed only once every new row is scored
+        detector = copy.deepcopy(self.detector)
+        scores = pd.DataFrame(
+            [detector.score(record) for record in new[KEY + ['Tanggal', 'Anggaran', 'Realisasi']].to_dict('records')],
+            index=new.index,
+        )
+        hits = scores['Anomali'].to_numpy(dtype=bool)
+        rows = pd.concat([new.loc[hits, context], scores.loc[hits, ['Serapan (%)', 'Z-Score', 'Alasan']]], axis=1)
+        rows = rows.sort_values('Tanggal', ascending=False, kind='stable')
+        self.rows = pd.concat([rows, self.rows], ignore_index=True)
+        self.detector = detector
+        self.seen = self._fingerprint(df, context)
+        return self.rows
@@ -1,11 +1,22 @@
 import streamlit as st
+import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import base64
+import hashlib
 import io
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import LabelEncoder
+import os
+import time
+import uuid
 from datetime import datetime
+import anomaly
+import data_backend
+import perf
+
+# Derived frames are zero-copy views of the shared dataset and copy only on write
+pd.set_option("mode.copy_on_write", True)
+
+rerun_start = time.perf_counter()
 
 # === Page Configuration ===
 st.set_page_config(
@@ -14,347 +25,79 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# === Profiling (?profile=1, atau tombol di panel performa untuk rerun berikutnya) ===
+# Kept in session state: a rerun interrupted by a widget change, st.stop or an
+# error never reaches profile_save, and its profiler would still be running
+leftover = st.session_state.pop("_profiler", None)
+if leftover is not None:
+    perf.profile_discard(leftover)
+profile_rerun = st.query_params.get("profile") == "1" or st.session_state.pop("profile_next", False)
+profiler = None
+if profile_rerun:
+    profiler = st.session_state["_profiler"] = perf.profile_start()
+profiling_offered = perf.PANEL or st.query_params.get("profile") == "1" or st.query_params.get("perf") == "1"
+
+# === Static Assets (static/, served at app/static/) ===
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_SERVING = st.get_option("server.enableStaticServing")
+
+@st.cache_resource
+def read_asset(name):
+    with open(os.path.join(STATIC_DIR, name), "rb") as f:
+        return f.read()
+
+def asset_url(name):
+    # ?v=<hash> makes Tornado's static handler send a long-lived Cache-Control header
+    version = hashlib.sha1(read_asset(name)).hexdigest()[:10]
+    return f"app/static/{name}?v={version}"
+
 # === Enhanced CSS for Dark/Light Theme Compatibility ===
-st.markdown("""
-<style>
-    /* Base styling that works for both themes */
-    .stApp {
-        background-color: var(--background-color) !important;
-    }
-    
-    .main > div {
-        padding-top: 2rem;
-        padding-left: 1rem;
-        padding-right: 1rem;
-    }
-    
-    /* Dark theme variables */
-    :root {
-        --text-color-light: #262730;
-        --text-color-dark: #fafafa;
-        --bg-color-light: #ffffff;
-        --bg-color-dark: #0e1117;
-        --card-bg-light: #ffffff;
-        --card-bg-dark: #262730;
-        --border-color-light: #e6e6e6;
-        --border-color-dark: #4a4a4a;
-    }
-    
-    /* Detect dark theme and apply appropriate colors */
-    [data-theme="dark"] {
-        --background-color: var(--bg-color-dark);
-        --text-color: var(--text-color-dark);
-        --card-background: var(--card-bg-dark);
-        --border-color: var(--border-color-dark);
-    }
-    
-    [data-theme="light"] {
-        --background-color: var(--bg-color-light);
-        --text-color: var(--text-color-light);
-        --card-background: var(--card-bg-light);
-        --border-color: var(--border-color-light);
-    }
-    
-    /* Auto-detect theme based on Streamlit's default colors */
-    @media (prefers-color-scheme: dark) {
-        .stApp[data-theme="auto"] {
-            --background-color: var(--bg-color-dark);
-            --text-color: var(--text-color-dark);
-            --card-background: var(--card-bg-dark);
-            --border-color: var(--border-color-dark);
-        }
-    }
-    
-    @media (prefers-color-scheme: light) {
-        .stApp[data-theme="auto"] {
-            --background-color: var(--bg-color-light);
-            --text-color: var(--text-color-light);
-            --card-background: var(--card-bg-light);
-            --border-color: var(--border-color-light);
-        }
-    }
-    
-    /* Streamlit theme detection */
-    .stApp {
-        color: var(--text-color, #262730);
-    }
-    
-    /* Dark theme overrides */
-    [data-testid="stAppViewContainer"] > .main {
-        background-color: transparent;
-    }
-    
-    /* Enhanced metric cards with theme support */
-    .metric-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 1rem;
-        border-radius: 10px;
-        color: white !important;
-        text-align: center;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        margin-bottom: 1rem;
-        border: 1px solid rgba(255, 255, 255, 0.1);
-    }
-    
-    .metric-value {
-        font-size: 1.8rem;
-        font-weight: bold;
-        margin: 0.5rem 0;
-        color: white !important;
-    }
-    
-    .metric-label {
-        font-size: 0.9rem;
-        opacity: 0.9;
-        margin: 0;
-        color: white !important;
-    }
-    
-    /* Welcome card with theme adaptation */
-    .welcome-card {
-        background: linear-gradient(135deg, rgba(245, 247, 250, 0.95) 0%, rgba(195, 207, 226, 0.95) 100%);
-        padding: 2rem;
-        border-radius: 15px;
-        margin: 1rem 0;
-        box-shadow: 0 8px 25px rgba(0,0,0,0.1);
-        border: 1px solid rgba(0, 0, 0, 0.05);
-    }
-    
-    /* Dark theme welcome card */
-    @media (prefers-color-scheme: dark) {
-        .welcome-card {
-            background: linear-gradient(135deg, rgba(38, 39, 48, 0.95) 0%, rgba(68, 70, 84, 0.95) 100%);
-            border: 1px solid rgba(255, 255, 255, 0.1);
-            color: #fafafa !important;
-        }
-        
-        .welcome-card h3 {
-            color: #fafafa !important;
-        }
-        
-        .welcome-card p {
-            color: #e0e0e0 !important;
-        }
-    }
-    
-    /* Section headers with better contrast */
-    .section-header {
-        background: linear-gradient(90deg, #4facfe 0%, #00f2fe 100%);
-        color: white !important;
-        padding: 1rem;
-        border-radius: 10px;
-        margin: 1rem 0;
-        text-align: center;
-        font-weight: bold;
-        border: 1px solid rgba(255, 255, 255, 0.1);
-    }
-    
-    .section-header h3 {
-        color: white !important;
-        margin: 0;
-    }
-    
-    /* Info boxes with theme support */
-    .info-box {
-        background-color: rgba(231, 243, 255, 0.9);
-        border-left: 4px solid #2196F3;
-        padding: 1rem;
-        margin: 1rem 0;
-        border-radius: 5px;
-        color: #1a1a1a;
-    }
-    
-    .success-box {
-        background-color: rgba(232, 245, 232, 0.9);
-        border-left: 4px solid #4CAF50;
-        padding: 1rem;
-        margin: 1rem 0;
-        border-radius: 5px;
-        color: #1a1a1a;
-    }
-    
-    /* Dark theme info boxes */
-    @media (prefers-color-scheme: dark) {
-        .info-box {
-            background-color: rgba(33, 150, 243, 0.1);
-            border-left: 4px solid #2196F3;
-            color: #e0e0e0 !important;
-        }
-        
-        .success-box {
-            background-color: rgba(76, 175, 80, 0.1);
-            border-left: 4px solid #4CAF50;
-            color: #e0e0e0 !important;
-        }
-        
-        .info-box h4, .success-box h4 {
-            color: #fafafa !important;
-        }
-        
-        .info-box ul, .success-box ul,
-        .info-box p, .success-box p {
-            color: #e0e0e0 !important;
-        }
-    }
-    
-    /* Enhanced tabs styling */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 2px;
-        background-color: transparent !important;
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        height: 50px;
-        padding-left: 20px;
-        padding-right: 20px;
-        background-color: rgba(240, 242, 246, 0.8);
-        border-radius: 10px 10px 0 0;
-        color: #1f77b4;
-        font-weight: bold;
-        border: 1px solid rgba(0, 0, 0, 0.1);
-    }
-    
-    .stTabs [aria-selected="true"] {
-        background-color: #1f77b4 !important;
-        color: white !important;
-    }
-    
-    /* Dark theme tabs */
-    @media (prefers-color-scheme: dark) {
-        .stTabs [data-baseweb="tab"] {
-            background-color: rgba(38, 39, 48, 0.8);
-            color: #64b5f6;
-            border: 1px solid rgba(255, 255, 255, 0.1);
-        }
-        
-        .stTabs [aria-selected="true"] {
-            background-color: #1f77b4 !important;
-            color: white !important;
-        }
-    }
-    
-    /* Logo header with enhanced contrast */
-    .logo-header {
-        display: flex;
-        align-items: center;
-        gap: 1rem;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 1.5rem;
-        border-radius: 15px;
-        color: white !important;
-        margin-bottom: 2rem;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.2);
-        border: 1px solid rgba(255, 255, 255, 0.1);
-    }
-    
-    .logo-header h2 {
-        margin: 0;
-        color: white !important;
-        font-weight: bold !important;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-    }
-    
-    .logo-header p {
-        color: rgba(255, 255, 255, 0.9) !important;
-    }
-    
-    /* Container backgrounds */
-    .block-container {
-        background-color: transparent !important;
-        padding-top: 1rem !important;
-    }
-    
-    /* Tab content background */
-    .stTabs > div > div > div > div {
-        background-color: transparent !important;
-    }
-    
-    /* DataFrame styling for dark theme */
-    @media (prefers-color-scheme: dark) {
-        .stDataFrame {
-            background-color: rgba(38, 39, 48, 0.3) !important;
-        }
-        
-        .stDataFrame [data-testid="stTable"] {
-            background-color: rgba(38, 39, 48, 0.5) !important;
-        }
-    }
-    
-    /* Ensure all text is visible in both themes */
-    .stMarkdown, .stText, p, h1, h2, h3, h4, h5, h6, span, div {
-        color: inherit !important;
-    }
-    
-    /* Footer styling */
-    .footer-content {
-        text-align: center;
-        padding: 1rem;
-        background-color: rgba(248, 249, 250, 0.8);
-        border-radius: 10px;
-        margin-top: 2rem;
-        border: 1px solid rgba(0, 0, 0, 0.05);
-    }
-    
-    @media (prefers-color-scheme: dark) {
-        .footer-content {
-            background-color: rgba(38, 39, 48, 0.8);
-            border: 1px solid rgba(255, 255, 255, 0.1);
-        }
-        
-        .footer-content p {
-            color: #b0b0b0 !important;
-        }
-    }
-    
-    /* Enhanced download button */
-    .download-button {
-        background: linear-gradient(90deg, #56ab2f 0%, #a8e6cf 100%);
-        color: white !important;
-        padding: 0.5rem 1rem;
-        border-radius: 25px;
-        border: none;
-        font-weight: bold;
-        cursor: pointer;
-        text-decoration: none;
-        display: inline-block;
-        margin: 1rem 0;
-        box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1);
-    }
-    
-    /* Plotly chart backgrounds for dark theme */
-    @media (prefers-color-scheme: dark) {
-        .js-plotly-plot .plotly .modebar {
-            background-color: rgba(38, 39, 48, 0.8) !important;
+if STATIC_SERVING:
+    # Streamlit serves .css as text/plain, so fetch it once per page load and
+    # add it to the parent document; later reruns only resend this tiny script.
+    components.html(f"""
+    <script>
+        const doc = window.parent.document;
+        if (!doc.getElementById('dashboard-css')) {{
+            fetch(new URL('{asset_url("dashboard.css")}', window.parent.location.href))
+                .then(response => response.text())
+                .then(css => {{
+                    const style = doc.createElement('style');
+                    style.id = 'dashboard-css';
+                    style.textContent = css;
+                    doc.head.appendChild(style);
+                }});
+        }}
+    </script>
+    """, height=0)
+    logo_src = asset_url("logo_240.png")
+else:
+    st.markdown(f"<style>{read_asset('dashboard.css').decode()}</style>", unsafe_allow_html=True)
+    logo_src = "data:image/png;base64," + base64.b64encode(read_asset("logo_240.png")).decode()
+
+# st.tabs does not tell the server which tab is open; while profiling is on
+# offer, keep it in ?tab= so the next rerun (and its profile) can record it
+if profiling_offered:
+    components.html("""
+    <script>
+        const doc = window.parent.document;
+        if (!doc.body.dataset.tabTracker) {
+            doc.body.dataset.tabTracker = '1';
+            doc.addEventListener('click', event => {
+                const tab = event.target.closest('button[role="tab"]');
+                if (!tab) return;
+                const url = new URL(window.parent.location.href);
+                url.searchParams.set('tab', tab.innerText.trim());
+                window.parent.history.replaceState(window.parent.history.state, '', url);
+            }, true);
         }
-    }
-    
-    /* Warning and error text fixes */
-    .stAlert > div {
-        background-color: inherit !important;
-    }
-    
-    .stSuccess > div {
-        background-color: inherit !important;
-    }
-    
-    .stInfo > div {
-        background-color: inherit !important;
-    }
-    
-    .stWarning > div {
-        background-color: inherit !important;
-    }
-    
-    .stError > div {
-        background-color: inherit !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+    </script>
+    """, height=0)
 
 # === Logo Header ===
-st.markdown("""
+st.markdown(f"""
     <div class='logo-header'>
-        <img src='https://raw.githubusercontent.com/dinawseptiana/project-realisasi-belanja/main/logo.png' width='120'/>
+        <img src='{logo_src}' width='120'/>
         <div>
             <h2 style='color: white !important; font-weight: bold !important;'>Dashboard Anggaran & Realisasi Belanja</h2>
             <p style='margin: 0; opacity: 0.9; font-size: 1.1rem; color: white;'>Direktorat Jenderal Perbendaharaan (DJPb) Kementerian Keuangan Republik Indonesia</p>
@@ -362,32 +105,71 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-# === Load data dari GitHub ===
-@st.cache_data
-def load_data():
-    URL = "https://raw.githubusercontent.com/dinawseptiana/project-realisasi-belanja/main/data/RealisasiBelanja_cleaned.xlsx"
-    df = pd.read_excel(URL)
-    
-    # Preprocessing
-    df = df.dropna(subset=['Realisasi', 'Anggaran'])
-    df['Realisasi'] = df['Realisasi'].astype(str).str.replace(",", "").astype(float)
-    df['Anggaran'] = df['Anggaran'].astype(str).str.replace(",", "").astype(float)
-    df['Sisa Anggaran'] = df['Anggaran'] - df['Realisasi']
-    df['Tanggal'] = pd.to_datetime(df['Tanggal'])
-    df['TriwulanAngka'] = df['Triwulan'].replace({'I': 1, 'II': 2, 'III': 3, 'IV': 4})
-    
-    le_jenis = LabelEncoder()
-    df['JenisEncoded'] = le_jenis.fit_transform(df['Jenis Belanja'])
-    
-    return df, le_jenis
+# === Load data dari GitHub (atau REALISASI_SOURCE) ===
+# One read-only copy per process shared by all sessions (cache_data would
+# unpickle a private copy on every call); rebuilt in the background, together
+# with the anomaly scores (only new rows are scored) and the cross-filter
+# cube, when the source changes
+def linked_cube(backend):
+    """Totals per (Tahun, Triwulan, Jenis Belanja): the few hundred rows every linked chart is drawn from."""
+    cube = backend.aggregate(['Tahun', 'Triwulan', 'Jenis Belanja'], data_backend.MONEY)
+    cube['Label'] = cube['Tahun'].astype(str) + "-TW" + cube['Triwulan'].astype(str)
+    return data_backend.PandasBackend(data_backend.freeze(cube))
+
+@st.cache_resource
+def live_dataset():
+    return data_backend.LiveDataset(derive={'anomalies': anomaly.LiveFlags(), 'cube': linked_cube})
+
+with perf.timer("load_data"):
+    # Taken once: a refresh mid-rerun does not change what this rerun sees
+    dataset = live_dataset().get()
+    backend = dataset.backend
+    df_anomali = dataset.derived['anomalies']
+
+# === Cross-filtering ===
+# Selecting bars/points in a source chart reruns only its tab's fragment. The
+# source figure itself never depends on a selection, so it stays byte-identical
+# and Streamlit re-sends just a reference to it (messages over
+# global.minCachedMessageSize); only the linked charts change.
+SELECT = dict(on_select="rerun", selection_mode=("points", "box", "lasso"))
+
+def selection(event, field):
+    """Distinct values of ``field`` over the points selected in a chart event."""
+    points = event.selection.points if event else []
+    values = (p[field] for p in points if field in p)
+    # px custom_data arrives as one list per point
+    return list(dict.fromkeys(v[0] if isinstance(v, list) else v for v in values))
 
-df, le_jenis = load_data()
+# Source figures (and tab 6's rows) are built once per process for each
+# (snapshot, filters) key and shared by every session: nothing mutates them
+# afterwards, and sessions hold only the small keys. Bounded, so old snapshots
+# and filter combinations drop out.
+TAB6_CACHE_ENTRIES = int(os.environ.get("REALISASI_TAB6_CACHE_ENTRIES", "8"))
+
+def fragment_rerun():
+    """True while only fragments are rerunning (e.g. after a chart selection)."""
+    ctx = get_script_run_ctx()
+    return ctx is not None and bool(ctx.fragment_ids_this_run)
+
+def fragment_snapshot():
+    """The snapshot a fragment draws from: the rerun's own on a full rerun, the
+    current one on a fragment-only rerun. Fragments rerun with the arguments
+    and globals of the last full rerun, which may be a retired (DuckDB: closed)
+    snapshot by now."""
+    return live_dataset().get() if fragment_rerun() else dataset
+
+def flush_fragment_rerun():
+    """Export the metrics of a fragment-only rerun; a full rerun flushes once at its end."""
+    if fragment_rerun():
+        perf.flush(backend=data_backend.BACKEND)
 
 # === KPI Metrics ===
-total_anggaran = df['Anggaran'].sum()
-total_realisasi = df['Realisasi'].sum()
-rata2_persen = df['Realisasi'].sum() / df['Anggaran'].sum() * 100
-total_sisa = df['Sisa Anggaran'].sum()
+with perf.timer("kpi"):
+    totals = backend.aggregate([], ['Anggaran', 'Realisasi', 'Sisa Anggaran']).iloc[0]
+    total_anggaran = totals['Anggaran']
+    total_realisasi = totals['Realisasi']
+    rata2_persen = total_realisasi / total_anggaran * 100
+    total_sisa = totals['Sisa Anggaran']
 
 # Custom KPI Display
 col1, col2, col3, col4 = st.columns(4)
@@ -425,8 +207,9 @@ with col4:
     """, unsafe_allow_html=True)
 
 # === Tab Layout ===
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-    "🏠 Beranda", "📊 Realisasi Anggaran", "🔍 Analisis Jenis Belanja", "🔮 Prediksi", "💸 Sisa Anggaran", "📍 Eksplorasi Data"
+tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
+    "🏠 Beranda", "📊 Realisasi Anggaran", "🔍 Analisis Jenis Belanja", "🔮 Prediksi", "💸 Sisa Anggaran", "📍 Eksplorasi Data",
+    "🚨 Anomali"
 ])
 
 # === Tab 1: Beranda ===
@@ -454,6 +237,7 @@ with tab1:
                 <li>Prediksi belanja untuk Triwulan III & IV Tahun 2025</li>
                 <li>Export data hasil prediksi dalam format Excel</li>
                 <li>Eksplorasi data interaktif dengan filter dinamis</li>
+                <li>Filter silang antar grafik: klik atau pilih area untuk memfilter grafik lain</li>
             </ul>
         </div>
         """, unsafe_allow_html=True)
@@ -464,10 +248,10 @@ with tab1:
             <h4>📊 Ringkasan Data</h4>
             <ul style='line-height: 1.8;'>
                 <li><b>Periode:</b> 2023 - 2025</li>
-                <li><b>Total Records:</b> """ + f"{len(df):,}" + """ data</li>
-                <li><b>Jenis Belanja:</b> """ + f"{df['Jenis Belanja'].nunique()}" + """ kategori</li>
+                <li><b>Total Records:</b> """ + f"{backend.count():,}" + """ data</li>
+                <li><b>Jenis Belanja:</b> """ + f"{len(backend.distinct('Jenis Belanja'))}" + """ kategori</li>
                 <li><b>Efisiensi Rata-rata:</b> """ + f"{rata2_persen:.1f}%" + """</li>
-                <li><b>Last Update:</b> """ + datetime.now().strftime("%d %B %Y") + """</li>
+                <li><b>Last Update:</b> """ + dataset.loaded_at.strftime("%d %B %Y") + """</li>
             </ul>
         </div>
         """, unsafe_allow_html=True)
@@ -478,16 +262,20 @@ with tab1:
     insight_col1, insight_col2, insight_col3 = st.columns(3)
     
     # Top performing year
-    top_year = df.groupby('Tahun')['Realisasi'].sum().idxmax()
-    top_year_value = df.groupby('Tahun')['Realisasi'].sum().max()
-    
-    # Best performing expense type
-    top_expense = df.groupby('Jenis Belanja')['Realisasi'].sum().idxmax()
-    top_expense_value = df.groupby('Jenis Belanja')['Realisasi'].sum().max()
-    
-    # Best quarter
-    top_quarter = df.groupby('Triwulan')['Realisasi'].sum().idxmax()
-    top_quarter_value = df.groupby('Triwulan')['Realisasi'].sum().max()
+    with perf.timer("tab1.aggregate"):
+        realisasi_tahun = backend.aggregate(['Tahun'], ['Realisasi']).set_index('Tahun')['Realisasi']
+        top_year = realisasi_tahun.idxmax()
+        top_year_value = realisasi_tahun.max()
+
+        # Best performing expense type
+        realisasi_jenis = backend.aggregate(['Jenis Belanja'], ['Realisasi']).set_index('Jenis Belanja')['Realisasi']
+        top_expense = realisasi_jenis.idxmax()
+        top_expense_value = realisasi_jenis.max()
+
+        # Best quarter
+        realisasi_triwulan = backend.aggregate(['Triwulan'], ['Realisasi']).set_index('Triwulan')['Realisasi']
+        top_quarter = realisasi_triwulan.idxmax()
+        top_quarter_value = realisasi_triwulan.max()
     
     with insight_col1:
         st.info(f"🏆 **Tahun Terbaik**\n\n{top_year} dengan realisasi Rp {top_year_value:,.0f}")
@@ -498,15 +286,18 @@ with tab1:
     with insight_col3:
         st.warning(f"📅 **Triwulan Terbaik**\n\nTW-{top_quarter} dengan realisasi Rp {top_quarter_value:,.0f}")
 
+# === Charting stack ===
+# Imported only after the KPI cards and Beranda tab have been sent, so a cold
+# process shows the first screen without paying for Plotly.
+with perf.timer("import.plotly"):
+    import plotly.express as px
+    import plotly.graph_objects as go
+
 # === Tab 2: Realisasi Anggaran ===
-with tab2:
-    st.markdown("<div class='section-header'><h3>📊 Analisis Realisasi Anggaran</h3></div>", unsafe_allow_html=True)
-    
-    df_agg = df.groupby(['Tahun', 'Triwulan'])[['Anggaran', 'Realisasi']].sum().reset_index()
-    df_agg['Label'] = df_agg['Tahun'].astype(str) + "-TW" + df_agg['Triwulan'].astype(str)
-    df_agg['Efisiensi'] = (df_agg['Realisasi'] / df_agg['Anggaran'] * 100).round(1)
-    
-    # Enhanced bar chart with dark theme template
+@st.cache_resource(max_entries=2)
+def fig_tab2_periode(_df_agg, loaded_at):
+    """Periode bar chart of a snapshot, keyed on ``loaded_at`` (``_df_agg`` is not hashed)."""
+    df_agg = _df_agg
     fig = go.Figure()
     fig.add_trace(go.Bar(
         name='Anggaran',
@@ -524,7 +315,7 @@ with tab2:
         text=df_agg['Realisasi'].apply(lambda x: f'Rp {x/1e9:.1f}M'),
         textposition='outside'
     ))
-    
+
     fig.update_layout(
         title="💰 Perbandingan Anggaran vs Realisasi per Triwulan",
         xaxis_title="Periode",
@@ -535,80 +326,202 @@ with tab2:
         paper_bgcolor='rgba(0,0,0,0)',
         plot_bgcolor='rgba(0,0,0,0)'
     )
-    st.plotly_chart(fig, use_container_width=True)
-    
+    return fig
+
+@st.fragment
+def tab2_linked():
+    snapshot = fragment_snapshot()
+    cube, loaded_at = snapshot.derived['cube'], snapshot.loaded_at
+    with perf.timer("tab2.aggregate"):
+        df_agg = cube.aggregate(['Tahun', 'Triwulan', 'Label'], ['Anggaran', 'Realisasi'])
+        df_agg['Efisiensi'] = (df_agg['Realisasi'] / df_agg['Anggaran'] * 100).round(1)
+    
+    # Enhanced bar chart with dark theme template; selecting periods filters the charts below
+    with perf.timer("tab2.fig_anggaran"):
+        fig = fig_tab2_periode(df_agg, loaded_at)
+        event = st.plotly_chart(fig, use_container_width=True, key="tab2_periode", **SELECT)
+    
+    with perf.timer("tab2.crossfilter"):
+        periode = selection(event, 'x')
+        if periode:
+            st.caption(f"🔗 Difilter ke periode: {', '.join(periode)} (klik dua kali area grafik untuk reset)")
+            df_agg = df_agg[df_agg['Label'].isin(periode)]
+        else:
+            st.caption("🔗 Klik atau pilih (box) batang periode untuk memfilter grafik di bawah")
+        df_jenis = cube.aggregate(['Jenis Belanja'], ['Anggaran', 'Realisasi'], where={'Label': periode} if periode else None)
+        df_jenis['Efisiensi'] = (df_jenis['Realisasi'] / df_jenis['Anggaran'] * 100).round(1)
+
+    col1, col2 = st.columns(2)
+
     # Efficiency trend
-    fig_eff = px.line(
-        df_agg, 
-        x='Label', 
-        y='Efisiensi',
-        markers=True,
-        title="📈 Tren Efisiensi Realisasi Anggaran (%)",
-        color_discrete_sequence=['#e74c3c']
-    )
-    fig_eff.update_layout(
-        template='plotly_white', 
-        yaxis_title="Efisiensi (%)",
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)'
-    )
-    st.plotly_chart(fig_eff, use_container_width=True)
+    with perf.timer("tab2.fig_efisiensi"):
+        fig_eff = go.Figure(go.Scatter(
+            x=df_agg['Label'],
+            y=df_agg['Efisiensi'],
+            mode='lines+markers',
+            line=dict(color='#e74c3c')
+        ))
+        fig_eff.update_layout(
+            title="📈 Tren Efisiensi Realisasi Anggaran (%)",
+            template='plotly_white', 
+            xaxis_title="Periode",
+            yaxis_title="Efisiensi (%)",
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)'
+        )
+        col1.plotly_chart(fig_eff, use_container_width=True)
+
+    # Breakdown of the selected periods
+    with perf.timer("tab2.fig_jenis"):
+        fig_jenis = go.Figure([
+            go.Bar(name='Anggaran', x=df_jenis['Jenis Belanja'], y=df_jenis['Anggaran'], marker_color='lightblue'),
+            go.Bar(name='Realisasi', x=df_jenis['Jenis Belanja'], y=df_jenis['Realisasi'], marker_color='darkblue',
+                   text=df_jenis['Efisiensi'].map(lambda x: f"{x}%"), textposition='outside'),
+        ])
+        fig_jenis.update_layout(
+            title="💼 Anggaran vs Realisasi per Jenis Belanja",
+            yaxis_title="Nilai (Rupiah)",
+            barmode='group',
+            template='plotly_white',
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)'
+        )
+        col2.plotly_chart(fig_jenis, use_container_width=True)
     
     # Summary table
     st.markdown("### 📋 Ringkasan Efisiensi per Periode")
-    summary_df = df_agg[['Label', 'Anggaran', 'Realisasi', 'Efisiensi']].copy()
+    summary_df = df_agg[['Label', 'Anggaran', 'Realisasi', 'Efisiensi']]
     summary_df['Anggaran'] = summary_df['Anggaran'].apply(lambda x: f"Rp {x:,.0f}")
     summary_df['Realisasi'] = summary_df['Realisasi'].apply(lambda x: f"Rp {x:,.0f}")
     summary_df['Efisiensi'] = summary_df['Efisiensi'].apply(lambda x: f"{x}%")
     st.dataframe(summary_df, use_container_width=True, hide_index=True)
+    flush_fragment_rerun()
 
-# === Tab 3: Analisis Jenis Belanja ===
-with tab3:
-    st.markdown("<div class='section-header'><h3>🔍 Analisis Distribusi Jenis Belanja</h3></div>", unsafe_allow_html=True)
+with tab2:
+    st.markdown("<div class='section-header'><h3>📊 Analisis Realisasi Anggaran</h3></div>", unsafe_allow_html=True)
+    tab2_linked()
 
-    # Overall distribution
-    df_pie_total = df.groupby('Jenis Belanja')['Realisasi'].sum().reset_index()
-    df_pie_total['Persentase'] = (df_pie_total['Realisasi'] / df_pie_total['Realisasi'].sum() * 100).round(1)
-    
-    fig_pie_total = px.pie(
-        df_pie_total, 
-        names='Jenis Belanja', 
-        values='Realisasi',
-        title="🥧 Distribusi Total Realisasi per Jenis Belanja (2023-2025)",
-        color_discrete_sequence=px.colors.qualitative.Set3
-    )
-    fig_pie_total.update_traces(textposition='inside', textinfo='percent+label')
+# === Tab 3: Analisis Jenis Belanja ===
+@st.cache_resource(max_entries=2)
+def fig_tab3_jenis(_df_pie_total, loaded_at):
+    """Jenis Belanja bar chart of a snapshot, keyed on ``loaded_at`` (``_df_pie_total`` is not hashed)."""
+    df_pie_total = _df_pie_total
+    fig_pie_total = go.Figure(go.Bar(
+        x=df_pie_total['Realisasi'],
+        y=df_pie_total['Jenis Belanja'],
+        orientation='h',
+        marker_color=px.colors.qualitative.Set3[:len(df_pie_total)],
+        text=df_pie_total['Persentase'].map(lambda x: f"{x}%"),
+        textposition='auto',
+        hovertemplate="%{y}<br>Realisasi: Rp %{x:,.0f}<extra></extra>"
+    ))
     fig_pie_total.update_layout(
-        height=500,
+        title="📊 Distribusi Total Realisasi per Jenis Belanja (2023-2025)",
+        xaxis_title="Realisasi (Rupiah)",
+        height=350,
         paper_bgcolor='rgba(0,0,0,0)',
         plot_bgcolor='rgba(0,0,0,0)'
     )
-    st.plotly_chart(fig_pie_total, use_container_width=True)
+    return fig_pie_total
+
+@st.fragment
+def tab3_linked():
+    snapshot = fragment_snapshot()
+    cube, loaded_at = snapshot.derived['cube'], snapshot.loaded_at
+    # Overall distribution; selecting jenis bars filters the charts below
+    # (a bar chart rather than a pie: Plotly pies cannot report a selection)
+    with perf.timer("tab3.aggregate"):
+        df_pie_total = cube.aggregate(['Jenis Belanja'], ['Realisasi'])
+        df_pie_total['Persentase'] = (df_pie_total['Realisasi'] / df_pie_total['Realisasi'].sum() * 100).round(1)
+    
+    with perf.timer("tab3.fig_total"):
+        fig_pie_total = fig_tab3_jenis(df_pie_total, loaded_at)
+        event = st.plotly_chart(fig_pie_total, use_container_width=True, key="tab3_jenis", **SELECT)
+
+    with perf.timer("tab3.crossfilter"):
+        jenis = selection(event, 'y')
+        if jenis:
+            st.caption(f"🔗 Difilter ke jenis belanja: {', '.join(jenis)} (klik dua kali area grafik untuk reset)")
+        else:
+            st.caption("🔗 Klik atau pilih (box) batang jenis belanja untuk memfilter grafik di bawah")
 
-    # Year-by-year analysis
-    for tahun in sorted(df['Tahun'].unique()):
+    # Year-by-year analysis: one aggregation, shown as a single heatmap; the
+    # per-year pies only render for the years picked below
+    with perf.timer("tab3.aggregate"):
+        df_jenis_tw = cube.aggregate(['Tahun', 'Triwulan', 'Jenis Belanja'], ['Realisasi'])
+        df_jenis_tw['Periode'] = df_jenis_tw['Tahun'].astype(str) + " TW-" + df_jenis_tw['Triwulan'].astype(str)
+        # Shares stay relative to the whole quarter when only some jenis are selected
+        df_jenis_tw['Persentase'] = (
+            df_jenis_tw['Realisasi'] / df_jenis_tw.groupby('Periode')['Realisasi'].transform('sum') * 100
+        ).round(1)
+        if jenis:
+            df_jenis_tw = df_jenis_tw[df_jenis_tw['Jenis Belanja'].isin(jenis)]
+        daftar_tahun = sorted(df_jenis_tw['Tahun'].unique())
+
+    with perf.timer("tab3.fig_heatmap"):
+        df_heat = df_jenis_tw.sort_values(['Tahun', 'Triwulan'])
+        heat_pct = df_heat.pivot(index='Jenis Belanja', columns='Periode', values='Persentase')
+        heat_rp = df_heat.pivot(index='Jenis Belanja', columns='Periode', values='Realisasi')
+        periode = df_heat['Periode'].unique()
+        fig_heat = go.Figure(go.Heatmap(
+            z=heat_pct[periode].values,
+            x=periode,
+            y=heat_pct.index.astype(str),
+            customdata=heat_rp[periode].values,
+            text=heat_pct[periode].values,
+            texttemplate="%{text:.0f}%",
+            colorscale='Blues',
+            colorbar=dict(title="% TW"),
+            hovertemplate="%{x}<br>%{y}<br>Realisasi: Rp %{customdata:,.0f}<br>Porsi: %{z:.1f}%<extra></extra>"
+        ))
+        fig_heat.update_layout(
+            title="🗓️ Porsi Realisasi per Jenis Belanja per Triwulan",
+            height=350,
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)'
+        )
+        st.plotly_chart(fig_heat, use_container_width=True)
+
+    df_ringkas = df_jenis_tw.groupby(['Tahun', 'Jenis Belanja'], observed=True)['Realisasi'].sum().reset_index()
+    idx_max = df_ringkas.groupby('Tahun')['Realisasi'].idxmax()
+    ringkasan_tahun = pd.DataFrame({
+        'Tahun': df_ringkas.loc[idx_max, 'Tahun'].values,
+        'Total Realisasi': df_ringkas.groupby('Tahun')['Realisasi'].sum().map(lambda x: f"Rp {x:,.0f}").values,
+        'Jenis Belanja Tertinggi': df_ringkas.loc[idx_max, 'Jenis Belanja'].astype(str).values,
+        'Nilai Tertinggi': df_ringkas.loc[idx_max, 'Realisasi'].map(lambda x: f"Rp {x:,.0f}").values,
+    })
+    st.dataframe(ringkasan_tahun, use_container_width=True, hide_index=True)
+
+    detail_tahun = st.multiselect(
+        "🔎 Tampilkan detail per tahun:",
+        options=daftar_tahun[::-1],
+        default=[],
+        key="tab3_detail_tahun",
+    )
+    for tahun in sorted(detail_tahun):
         st.markdown(f"### 📅 Analisis Tahun {tahun}")
         
-        df_tahun = df[df['Tahun'] == tahun]
+        df_tahun = df_jenis_tw[df_jenis_tw['Tahun'] == tahun]
         total_tahun = df_tahun['Realisasi'].sum()
         
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            df_pie_tahun = df_tahun.groupby('Jenis Belanja')['Realisasi'].sum().reset_index()
-            fig_pie_tahun = px.pie(
-                df_pie_tahun, 
-                names='Jenis Belanja', 
-                values='Realisasi',
-                title=f"Distribusi Realisasi Tahun {tahun}",
-                color_discrete_sequence=px.colors.qualitative.Pastel
-            )
-            fig_pie_tahun.update_traces(textposition='inside', textinfo='percent+label')
-            fig_pie_tahun.update_layout(
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)'
-            )
-            st.plotly_chart(fig_pie_tahun, use_container_width=True)
+            with perf.timer("tab3.fig_tahun"):
+                df_pie_tahun = df_tahun.groupby('Jenis Belanja', observed=True)['Realisasi'].sum().reset_index()
+                fig_pie_tahun = px.pie(
+                    df_pie_tahun, 
+                    names='Jenis Belanja', 
+                    values='Realisasi',
+                    title=f"Distribusi Realisasi Tahun {tahun}",
+                    color_discrete_sequence=px.colors.qualitative.Pastel
+                )
+                fig_pie_tahun.update_traces(textposition='inside', textinfo='percent+label')
+                fig_pie_tahun.update_layout(
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    plot_bgcolor='rgba(0,0,0,0)'
+                )
+                st.plotly_chart(fig_pie_tahun, use_container_width=True)
         
         with col2:
             st.markdown(f"""
@@ -626,38 +539,48 @@ with tab3:
         triwulan_cols = st.columns(len(triwulan_list))
         
         for i, tw in enumerate(triwulan_list):
-            df_tw = df_tahun[df_tahun['Triwulan'] == tw].groupby('Jenis Belanja')[['Realisasi']].sum().reset_index()
-            if not df_tw.empty:
-                fig_tw = px.pie(
-                    df_tw, 
-                    names='Jenis Belanja', 
-                    values='Realisasi',
-                    title=f"TW-{tw}",
-                    color_discrete_sequence=px.colors.qualitative.Pastel
-                )
-                fig_tw.update_traces(textposition='inside', textinfo='percent')
-                fig_tw.update_layout(
-                    height=300, 
-                    showlegend=False,
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    plot_bgcolor='rgba(0,0,0,0)'
-                )
-                triwulan_cols[i].plotly_chart(fig_tw, use_container_width=True)
+            with perf.timer("tab3.fig_triwulan"):
+                df_tw = df_tahun[df_tahun['Triwulan'] == tw].groupby('Jenis Belanja', observed=True)[['Realisasi']].sum().reset_index()
+                if not df_tw.empty:
+                    fig_tw = px.pie(
+                        df_tw, 
+                        names='Jenis Belanja', 
+                        values='Realisasi',
+                        title=f"TW-{tw}",
+                        color_discrete_sequence=px.colors.qualitative.Pastel
+                    )
+                    fig_tw.update_traces(textposition='inside', textinfo='percent')
+                    fig_tw.update_layout(
+                        height=300, 
+                        showlegend=False,
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        plot_bgcolor='rgba(0,0,0,0)'
+                    )
+                    triwulan_cols[i].plotly_chart(fig_tw, use_container_width=True)
+    flush_fragment_rerun()
+
+with tab3:
+    st.markdown("<div class='section-header'><h3>🔍 Analisis Distribusi Jenis Belanja</h3></div>", unsafe_allow_html=True)
+    tab3_linked()
 
 # === Tab 4: Prediksi ===
 with tab4:
     st.markdown("<div class='section-header'><h3>🔮 Prediksi Realisasi Belanja</h3></div>", unsafe_allow_html=True)
     
-    # Model training
-    df_model = df.groupby(['Tahun', 'Triwulan', 'JenisEncoded'])[['Realisasi', 'Anggaran', 'Sisa Anggaran']].sum().reset_index()
-    X = df_model[['Tahun', 'Triwulan', 'JenisEncoded', 'Anggaran', 'Sisa Anggaran']]
-    y = df_model['Realisasi']
+    # Model training (scikit-learn is only loaded once the prediction runs)
+    with perf.timer("import.sklearn"):
+        from sklearn.linear_model import LinearRegression
 
-    model = LinearRegression()
-    model.fit(X, y)
-    
-    # Model performance
-    score = model.score(X, y)
+    with perf.timer("tab4.fit"):
+        df_model = backend.aggregate(['Tahun', 'Triwulan', 'JenisEncoded'], ['Realisasi', 'Anggaran', 'Sisa Anggaran'])
+        X = df_model[['Tahun', 'Triwulan', 'JenisEncoded', 'Anggaran', 'Sisa Anggaran']]
+        y = df_model['Realisasi']
+
+        model = LinearRegression()
+        model.fit(X, y)
+
+        # Model performance
+        score = model.score(X, y)
     st.markdown(f"""
     <div class='info-box'>
         <h4>🤖 Informasi Model</h4>
@@ -668,29 +591,29 @@ with tab4:
     """, unsafe_allow_html=True)
 
     # Prediction for Q3 & Q4 2025
-    pred_data = []
-    for tri in [3, 4]:
-        for jenis in df['JenisEncoded'].unique():
-            rata2_anggaran = df[df['JenisEncoded'] == jenis]['Anggaran'].mean()
-            rata2_sisa = df[df['JenisEncoded'] == jenis]['Sisa Anggaran'].mean()
-            pred_data.append({
-                'Tahun': 2025,
-                'Triwulan': tri,
-                'JenisEncoded': jenis,
-                'Anggaran': rata2_anggaran,
-                'Sisa Anggaran': rata2_sisa
-            })
-
-    df_pred = pd.DataFrame(pred_data)
-    df_pred['Prediksi'] = model.predict(df_pred[['Tahun', 'Triwulan', 'JenisEncoded', 'Anggaran', 'Sisa Anggaran']])
-    df_pred['Jenis Belanja'] = le_jenis.inverse_transform(df_pred['JenisEncoded'])
-    df_pred['Label'] = df_pred['Tahun'].astype(str) + "-TW" + df_pred['Triwulan'].astype(str)
+    with perf.timer("tab4.predict"):
+        df_rata2 = backend.aggregate(['JenisEncoded', 'Jenis Belanja'], ['Anggaran', 'Sisa Anggaran'], agg='mean')
+        pred_data = []
+        for tri in [3, 4]:
+            for _, row in df_rata2.iterrows():
+                pred_data.append({
+                    'Tahun': 2025,
+                    'Triwulan': tri,
+                    'JenisEncoded': row['JenisEncoded'],
+                    'Anggaran': row['Anggaran'],
+                    'Sisa Anggaran': row['Sisa Anggaran'],
+                    'Jenis Belanja': row['Jenis Belanja']
+                })
+
+        df_pred = pd.DataFrame(pred_data)
+        df_pred['Prediksi'] = model.predict(df_pred[['Tahun', 'Triwulan', 'JenisEncoded', 'Anggaran', 'Sisa Anggaran']])
+        df_pred['Label'] = df_pred['Tahun'].astype(str) + "-TW" + df_pred['Triwulan'].astype(str)
 
     # Display predictions
     st.markdown("### 📊 Hasil Prediksi TW III & IV 2025")
     
     # Format the prediction table
-    display_pred = df_pred[['Label', 'Jenis Belanja', 'Anggaran', 'Sisa Anggaran', 'Prediksi']].copy()
+    display_pred = df_pred[['Label', 'Jenis Belanja', 'Anggaran', 'Sisa Anggaran', 'Prediksi']]
     display_pred['Anggaran'] = display_pred['Anggaran'].apply(lambda x: f"Rp {x:,.0f}")
     display_pred['Sisa Anggaran'] = display_pred['Sisa Anggaran'].apply(lambda x: f"Rp {x:,.0f}")
     display_pred['Prediksi'] = display_pred['Prediksi'].apply(lambda x: f"Rp {x:,.0f}")
@@ -698,34 +621,36 @@ with tab4:
     st.dataframe(display_pred, use_container_width=True, hide_index=True)
 
     # Prediction visualization
-    fig_pred = px.bar(
-        df_pred, 
-        x='Label', 
-        y='Prediksi', 
-        color='Jenis Belanja',
-        title="📈 Prediksi Realisasi per Jenis Belanja",
-        color_discrete_sequence=px.colors.qualitative.Set2
-    )
-    fig_pred.update_layout(
-        template='plotly_white', 
-        height=500,
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)'
-    )
-    st.plotly_chart(fig_pred, use_container_width=True)
+    with perf.timer("tab4.fig_prediksi"):
+        fig_pred = px.bar(
+            df_pred, 
+            x='Label', 
+            y='Prediksi', 
+            color='Jenis Belanja',
+            title="📈 Prediksi Realisasi per Jenis Belanja",
+            color_discrete_sequence=px.colors.qualitative.Set2
+        )
+        fig_pred.update_layout(
+            template='plotly_white', 
+            height=500,
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)'
+        )
+        st.plotly_chart(fig_pred, use_container_width=True)
 
     # Download functionality
-    buffer = io.BytesIO()
-    df_pred.to_excel(buffer, index=False, engine='openpyxl')
-    buffer.seek(0)
-
-    st.download_button(
-        label="💾 Unduh Hasil Prediksi (Excel)",
-        data=buffer,
-        file_name=f"prediksi_TW3_TW4_2025_{datetime.now().strftime('%Y%m%d')}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        help="Klik untuk mengunduh hasil prediksi dalam format Excel"
-    )
+    with perf.timer("tab4.export"):
+        buffer = io.BytesIO()
+        df_pred.to_excel(buffer, index=False, engine='openpyxl')
+        buffer.seek(0)
+
+        st.download_button(
+            label="💾 Unduh Hasil Prediksi (Excel)",
+            data=buffer,
+            file_name=f"prediksi_TW3_TW4_2025_{datetime.now().strftime('%Y%m%d')}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            help="Klik untuk mengunduh hasil prediksi dalam format Excel"
+        )
     
     # Prediction summary
     total_pred_tw3 = df_pred[df_pred['Triwulan'] == 3]['Prediksi'].sum()
@@ -741,28 +666,30 @@ with tab4:
 with tab5:
     st.markdown("<div class='section-header'><h3>💸 Analisis Sisa Anggaran</h3></div>", unsafe_allow_html=True)
     
-    df_sisa = df.groupby('Jenis Belanja')[['Sisa Anggaran', 'Anggaran', 'Realisasi']].sum().reset_index()
-    df_sisa['Persentase_Sisa'] = (df_sisa['Sisa Anggaran'] / df_sisa['Anggaran'] * 100).round(1)
-    df_sisa = df_sisa.sort_values('Sisa Anggaran', ascending=False)
+    with perf.timer("tab5.aggregate"):
+        df_sisa = backend.aggregate(['Jenis Belanja'], ['Sisa Anggaran', 'Anggaran', 'Realisasi'])
+        df_sisa['Persentase_Sisa'] = (df_sisa['Sisa Anggaran'] / df_sisa['Anggaran'] * 100).round(1)
+        df_sisa = df_sisa.sort_values('Sisa Anggaran', ascending=False)
     
     # Bar chart for remaining budget
-    fig_sisa = px.bar(
-        df_sisa, 
-        x='Jenis Belanja', 
-        y='Sisa Anggaran',
-        title="💰 Total Sisa Anggaran per Jenis Belanja",
-        color='Persentase_Sisa',
-        color_continuous_scale='RdYlBu_r',
-        text='Sisa Anggaran'
-    )
-    fig_sisa.update_traces(texttemplate='Rp %{text:,.0f}', textposition='outside')
-    fig_sisa.update_layout(
-        template='plotly_white', 
-        height=500,
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)'
-    )
-    st.plotly_chart(fig_sisa, use_container_width=True)
+    with perf.timer("tab5.fig_sisa"):
+        fig_sisa = px.bar(
+            df_sisa, 
+            x='Jenis Belanja', 
+            y='Sisa Anggaran',
+            title="💰 Total Sisa Anggaran per Jenis Belanja",
+            color='Persentase_Sisa',
+            color_continuous_scale='RdYlBu_r',
+            text='Sisa Anggaran'
+        )
+        fig_sisa.update_traces(texttemplate='Rp %{text:,.0f}', textposition='outside')
+        fig_sisa.update_layout(
+            template='plotly_white', 
+            height=500,
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)'
+        )
+        st.plotly_chart(fig_sisa, use_container_width=True)
     
     # Efficiency analysis
     st.markdown("### 📊 Analisis Efisiensi Anggaran")
@@ -797,7 +724,7 @@ with tab5:
     
     # Detailed table
     st.markdown("### 📋 Detail Sisa Anggaran")
-    display_sisa = df_sisa.copy()
+    display_sisa = df_sisa.copy(deep=False)
     display_sisa['Anggaran'] = display_sisa['Anggaran'].apply(lambda x: f"Rp {x:,.0f}")
     display_sisa['Realisasi'] = display_sisa['Realisasi'].apply(lambda x: f"Rp {x:,.0f}")
     display_sisa['Sisa Anggaran'] = display_sisa['Sisa Anggaran'].apply(lambda x: f"Rp {x:,.0f}")
@@ -806,49 +733,54 @@ with tab5:
     st.dataframe(display_sisa, use_container_width=True, hide_index=True)
 
 # === Tab 6: Eksplorasi Data ===
-with tab6:
-    st.markdown("<div class='section-header'><h3>📍 Eksplorasi Data Interaktif</h3></div>", unsafe_allow_html=True)
-    
-    # Filters
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        jenis_opsi = df['Jenis Belanja'].unique().tolist()
-        pilihan_jenis = st.multiselect(
-            "🔍 Pilih Jenis Belanja:", 
-            options=jenis_opsi, 
-            default=jenis_opsi,
-            help="Pilih satu atau lebih jenis belanja untuk dianalisis"
-        )
-    
-    with col2:
-        pilihan_tahun = st.selectbox(
-            "📅 Pilih Tahun:", 
-            sorted(df['Tahun'].unique(), reverse=True),
-            help="Pilih tahun untuk analisis"
-        )
-    
-    with col3:
-        # Get available quarters for selected year
-        available_quarters = sorted(df[df['Tahun'] == pilihan_tahun]['Triwulan'].unique())
-        pilihan_triwulan = st.multiselect(
-            "📊 Pilih Triwulan:",
-            options=available_quarters,
-            default=available_quarters,
-            help="Pilih triwulan untuk analisis"
-        )
+@st.cache_resource(max_entries=TAB6_CACHE_ENTRIES)
+def tab6_rows(_backend, loaded_at, filters):
+    """Rows matching the tab 6 filters in a snapshot, keyed on ``loaded_at`` and ``filters``."""
+    return _backend.select(where=filters)
 
-    # Apply filters with more defensive approach
-    df_filtered = df.copy()
-    
-    # Apply filters step by step
-    if pilihan_jenis:
-        df_filtered = df_filtered[df_filtered['Jenis Belanja'].isin(pilihan_jenis)]
-    
-    df_filtered = df_filtered[df_filtered['Tahun'] == pilihan_tahun]
-    
-    if pilihan_triwulan:
-        df_filtered = df_filtered[df_filtered['Triwulan'].isin(pilihan_triwulan)]
+@st.cache_resource(max_entries=TAB6_CACHE_ENTRIES)
+def fig_tab6_scatter(_df_filtered, loaded_at, filters):
+    """Scatter plot of ``tab6_rows(..., loaded_at, filters)`` (``_df_filtered`` is not hashed)."""
+    df_filtered, pilihan_tahun = _df_filtered, filters['Tahun']
+    fig_scatter = px.scatter(
+        df_filtered.assign(Baris=range(len(df_filtered))),
+        x='Anggaran',
+        y='Realisasi',
+        size=df_filtered['Sisa Anggaran'].clip(lower=0),  # over-budget rows have negative sisa
+        color='Jenis Belanja',
+        hover_data=['Tahun', 'Triwulan'],
+        custom_data=['Baris'],
+        title=f"💡 Analisis Anggaran vs Realisasi - {pilihan_tahun}",
+        size_max=50,
+        opacity=0.7
+    )
+
+    # Add diagonal line (perfect efficiency)
+    max_val = max(df_filtered['Anggaran'].max(), df_filtered['Realisasi'].max())
+    fig_scatter.add_shape(
+        type="line",
+        x0=0, y0=0, x1=max_val, y1=max_val,
+        line=dict(color="red", width=2, dash="dash"),
+        name="Efisiensi 100%"
+    )
+
+    fig_scatter.update_layout(
+        template='plotly_white',
+        height=600,
+        xaxis_title="Anggaran (Rp)",
+        yaxis_title="Realisasi (Rp)",
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig_scatter
+
+@st.fragment
+def tab6_linked(filters):
+    snapshot = fragment_snapshot()
+    backend, loaded_at = snapshot.backend, snapshot.loaded_at
+    pilihan_tahun = filters['Tahun']
+    with perf.timer("tab6.filter"):
+        df_filtered = tab6_rows(backend, loaded_at, filters)
     
     if df_filtered.empty:
         st.warning("⚠️ Tidak ada data yang sesuai dengan filter yang dipilih. Silakan ubah filter.")
@@ -857,23 +789,42 @@ with tab6:
         st.info("💡 **Tip**: Coba pilih filter yang berbeda atau reset ke default")
         
         # Show sample data structure
-        sample_data = df.head(10)[['Tahun', 'Triwulan', 'Jenis Belanja', 'Anggaran', 'Realisasi']]
+        sample_data = backend.select(['Tahun', 'Triwulan', 'Jenis Belanja', 'Anggaran', 'Realisasi'], limit=10)
         st.write("**Sample data yang tersedia:**")
         st.dataframe(sample_data, use_container_width=True)
-        
-    else:
-        # Show current filter results
-        st.success(f"✅ Menampilkan {len(df_filtered)} records dengan filter yang dipilih")
-        
-        # Summary metrics for filtered data
-        st.markdown("### 📊 Ringkasan Data Terpilih")
-        
+        return
+    
+    # Show current filter results
+    st.success(f"✅ Menampilkan {len(df_filtered)} records dengan filter yang dipilih")
+    
+    # Summary metrics for filtered data; filled in once the scatter selection is known
+    st.markdown("### 📊 Ringkasan Data Terpilih")
+    ringkasan = st.container()
+    
+    # Interactive scatter plot; a box/lasso selection filters everything else in this tab
+    st.markdown("### 🔍 Scatter Plot: Anggaran vs Realisasi")
+    
+    with perf.timer("tab6.fig_scatter"):
+        fig_scatter = fig_tab6_scatter(df_filtered, loaded_at, filters)
+        event = st.plotly_chart(fig_scatter, use_container_width=True, key="tab6_scatter", **SELECT)
+
+    with perf.timer("tab6.crossfilter"):
+        baris = selection(event, 'customdata')
+        if baris:
+            df_terpilih = df_filtered.iloc[sorted(baris)]
+            st.caption(f"🔗 {len(df_terpilih):,} titik terpilih memfilter ringkasan, grafik performa, tabel dan export "
+                       "(klik dua kali area grafik untuk reset)")
+        else:
+            df_terpilih = df_filtered
+            st.caption("🔗 Pilih area (box/lasso) pada scatter plot untuk memfilter ringkasan, grafik dan tabel")
+
+    with ringkasan:
         metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
         
-        filtered_anggaran = df_filtered['Anggaran'].sum()
-        filtered_realisasi = df_filtered['Realisasi'].sum()
+        filtered_anggaran = df_terpilih['Anggaran'].sum()
+        filtered_realisasi = df_terpilih['Realisasi'].sum()
         filtered_efisiensi = (filtered_realisasi / filtered_anggaran * 100) if filtered_anggaran > 0 else 0
-        filtered_records = len(df_filtered)
+        filtered_records = len(df_terpilih)
         
         with metric_col1:
             st.metric("📋 Total Records", f"{filtered_records:,}")
@@ -883,53 +834,21 @@ with tab6:
             st.metric("✅ Realisasi", f"Rp {filtered_realisasi:,.0f}")
         with metric_col4:
             st.metric("📈 Efisiensi", f"{filtered_efisiensi:.1f}%")
-        
-        # Interactive scatter plot
-        st.markdown("### 🔍 Scatter Plot: Anggaran vs Realisasi")
-        
-        fig_scatter = px.scatter(
-            df_filtered,
-            x='Anggaran',
-            y='Realisasi',
-            size='Sisa Anggaran',
-            color='Jenis Belanja',
-            hover_data=['Tahun', 'Triwulan'],
-            title=f"💡 Analisis Anggaran vs Realisasi - {pilihan_tahun}",
-            size_max=50,
-            opacity=0.7
-        )
-        
-        # Add diagonal line (perfect efficiency)
-        max_val = max(df_filtered['Anggaran'].max(), df_filtered['Realisasi'].max())
-        fig_scatter.add_shape(
-            type="line",
-            x0=0, y0=0, x1=max_val, y1=max_val,
-            line=dict(color="red", width=2, dash="dash"),
-            name="Efisiensi 100%"
-        )
-        
-        fig_scatter.update_layout(
-            template='plotly_white',
-            height=600,
-            xaxis_title="Anggaran (Rp)",
-            yaxis_title="Realisasi (Rp)",
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)'
-        )
-        st.plotly_chart(fig_scatter, use_container_width=True)
-        
-        # Performance analysis
-        st.markdown("### 📈 Analisis Performa per Triwulan")
-        
-        df_performance = df_filtered.groupby('Triwulan').agg({
+    
+    # Performance analysis
+    st.markdown("### 📈 Analisis Performa per Triwulan")
+    
+    with perf.timer("tab6.aggregate"):
+        df_performance = df_terpilih.groupby('Triwulan', observed=True).agg({
             'Anggaran': 'sum',
             'Realisasi': 'sum',
             'Sisa Anggaran': 'sum'
         }).reset_index()
         df_performance['Efisiensi'] = (df_performance['Realisasi'] / df_performance['Anggaran'] * 100).round(1)
-        
+    
+    with perf.timer("tab6.fig_performa"):
         fig_performance = go.Figure()
-        
+
         # Add bars for budget and realization
         fig_performance.add_trace(go.Bar(
             name='Anggaran',
@@ -939,7 +858,7 @@ with tab6:
             yaxis='y',
             offsetgroup=1
         ))
-        
+
         fig_performance.add_trace(go.Bar(
             name='Realisasi',
             x=df_performance['Triwulan'],
@@ -948,7 +867,7 @@ with tab6:
             yaxis='y',
             offsetgroup=2
         ))
-        
+
         # Add line for efficiency
         fig_performance.add_trace(go.Scatter(
             name='Efisiensi (%)',
@@ -959,7 +878,7 @@ with tab6:
             yaxis='y2',
             line=dict(width=3)
         ))
-        
+
         fig_performance.update_layout(
             title=f"📊 Performa Anggaran & Efisiensi per Triwulan - {pilihan_tahun}",
             xaxis_title="Triwulan",
@@ -972,40 +891,44 @@ with tab6:
             plot_bgcolor='rgba(0,0,0,0)'
         )
         st.plotly_chart(fig_performance, use_container_width=True)
-        
-        # Detailed data table
-        st.markdown("### 📋 Detail Data Terpilih")
-        
-        # Format data for display
-        display_data = df_filtered[['Tanggal', 'Tahun', 'Triwulan', 'Jenis Belanja', 'Anggaran', 'Realisasi', 'Sisa Anggaran']].copy()
-        display_data['Efisiensi (%)'] = (display_data['Realisasi'] / display_data['Anggaran'] * 100).round(1)
-        display_data['Anggaran'] = display_data['Anggaran'].apply(lambda x: f"Rp {x:,.0f}")
-        display_data['Realisasi'] = display_data['Realisasi'].apply(lambda x: f"Rp {x:,.0f}")
-        display_data['Sisa Anggaran'] = display_data['Sisa Anggaran'].apply(lambda x: f"Rp {x:,.0f}")
-        
-        st.dataframe(
-            display_data, 
-            use_container_width=True, 
-            hide_index=True,
-            column_config={
-                "Tanggal": st.column_config.DateColumn("📅 Tanggal"),
-                "Tahun": st.column_config.NumberColumn("📆 Tahun"),
-                "Triwulan": st.column_config.TextColumn("📊 Triwulan"),
-                "Jenis Belanja": st.column_config.TextColumn("💼 Jenis Belanja"),
-                "Anggaran": st.column_config.TextColumn("💰 Anggaran"),
-                "Realisasi": st.column_config.TextColumn("✅ Realisasi"),
-                "Sisa Anggaran": st.column_config.TextColumn("💸 Sisa Anggaran"),
-                "Efisiensi (%)": st.column_config.NumberColumn("📈 Efisiensi (%)", format="%.1f%%")
-            }
-        )
-        
-        # Export filtered data
-        if st.button("📥 Export Data Terpilih ke Excel", type="primary"):
+    
+    # Detailed data table
+    st.markdown("### 📋 Detail Data Terpilih")
+    
+    # Format data for display
+    display_data = df_terpilih[['Tanggal', 'Tahun', 'Triwulan', 'Jenis Belanja', 'Anggaran', 'Realisasi', 'Sisa Anggaran']]
+    display_data['Efisiensi (%)'] = (display_data['Realisasi'] / display_data['Anggaran'] * 100).round(1)
+    display_data['Anggaran'] = display_data['Anggaran'].apply(lambda x: f"Rp {x:,.0f}")
+    display_data['Realisasi'] = display_data['Realisasi'].apply(lambda x: f"Rp {x:,.0f}")
+    display_data['Sisa Anggaran'] = display_data['Sisa Anggaran'].apply(lambda x: f"Rp {x:,.0f}")
+    
+    st.dataframe(
+        display_data, 
+        use_container_width=True, 
+        hide_index=True,
+        column_config={
+            "Tanggal": st.column_config.DateColumn("📅 Tanggal"),
+            "Tahun": st.column_config.NumberColumn("📆 Tahun"),
+            "Triwulan": st.column_config.TextColumn("📊 Triwulan"),
+            "Jenis Belanja": st.column_config.TextColumn("💼 Jenis Belanja"),
+            "Anggaran": st.column_config.TextColumn("💰 Anggaran"),
+            "Realisasi": st.column_config.TextColumn("✅ Realisasi"),
+            "Sisa Anggaran": st.column_config.TextColumn("💸 Sisa Anggaran"),
+            "Efisiensi (%)": st.column_config.NumberColumn("📈 Efisiensi (%)", format="%.1f%%")
+        }
+    )
+    
+    # Export filtered data
+    if st.button("📥 Export Data Terpilih ke Excel", type="primary"):
+        with perf.timer("tab6.export"):
             output = io.BytesIO()
             with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df_filtered.to_excel(writer, sheet_name='Data_Filtered', index=False)
+                df_terpilih.to_excel(writer, sheet_name='Data_Filtered', index=False)
                 df_performance.to_excel(writer, sheet_name='Performance_Summary', index=False)
-            
+                data_backend.PandasBackend(snapshot.derived['anomalies']).select(where=filters).to_excel(
+                    writer, sheet_name='Anomali', index=False
+                )
+
             output.seek(0)
             st.download_button(
                 label="💾 Unduh File Excel",
@@ -1013,6 +936,113 @@ with tab6:
                 file_name=f"data_eksplorasi_{pilihan_tahun}_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
+    flush_fragment_rerun()
+
+with tab6:
+    st.markdown("<div class='section-header'><h3>📍 Eksplorasi Data Interaktif</h3></div>", unsafe_allow_html=True)
+    
+    # Filters
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        jenis_opsi = backend.distinct('Jenis Belanja')
+        pilihan_jenis = st.multiselect(
+            "🔍 Pilih Jenis Belanja:", 
+            options=jenis_opsi, 
+            default=jenis_opsi,
+            key="pilihan_jenis",
+            help="Pilih satu atau lebih jenis belanja untuk dianalisis"
+        )
+    
+    with col2:
+        pilihan_tahun = st.selectbox(
+            "📅 Pilih Tahun:", 
+            sorted(backend.distinct('Tahun'), reverse=True),
+            key="pilihan_tahun",
+            help="Pilih tahun untuk analisis"
+        )
+    
+    with col3:
+        # Get available quarters for selected year
+        available_quarters = backend.distinct('Triwulan', where={'Tahun': pilihan_tahun})
+        pilihan_triwulan = st.multiselect(
+            "📊 Pilih Triwulan:",
+            options=available_quarters,
+            default=available_quarters,
+            key="pilihan_triwulan",
+            help="Pilih triwulan untuk analisis"
+        )
+
+    # Apply filters with more defensive approach (empty multiselect = no filter)
+    filters = {'Tahun': pilihan_tahun}
+    if pilihan_jenis:
+        filters['Jenis Belanja'] = pilihan_jenis
+    if pilihan_triwulan:
+        filters['Triwulan'] = pilihan_triwulan
+
+    tab6_linked(filters)
+
+# === Tab 7: Anomali ===
+with tab7:
+    st.markdown("<div class='section-header'><h3>🚨 Deteksi Anomali Realisasi</h3></div>", unsafe_allow_html=True)
+    st.markdown(
+        f"Setiap posting dibandingkan dengan riwayat seri (Jenis Belanja, Triwulan)-nya. Posting ditandai jika "
+        f"serapannya lebih dari {anomaly.Z_THRESHOLD:g} standar deviasi di atas rata-rata seri, "
+        f"atau realisasinya melebihi anggaran."
+    )
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("🚨 Total Anomali", f"{len(df_anomali):,}")
+    col2.metric("💸 Realisasi > Anggaran", f"{df_anomali['Alasan'].str.contains(anomaly.OVER_BUDGET, regex=False).sum():,}")
+    col3.metric("📈 Lonjakan Serapan", f"{df_anomali['Alasan'].str.contains(anomaly.SPIKE, regex=False).sum():,}")
+
+    if df_anomali.empty:
+        st.success("✅ Tidak ada posting yang ditandai sebagai anomali.")
+    else:
+        # Newest first; the full list is in the export
+        st.dataframe(
+            df_anomali.head(1000),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Tanggal": st.column_config.DateColumn("📅 Tanggal", format="DD/MM/YYYY"),
+                "Anggaran": st.column_config.NumberColumn("💰 Anggaran", format="%.0f"),
+                "Realisasi": st.column_config.NumberColumn("✅ Realisasi", format="%.0f"),
+                "Sisa Anggaran": st.column_config.NumberColumn("💸 Sisa Anggaran", format="%.0f"),
+                "Serapan (%)": st.column_config.NumberColumn("📈 Serapan (%)", format="%.1f%%"),
+                "Z-Score": st.column_config.NumberColumn("Z-Score", format="%.2f"),
+            }
+        )
+        if len(df_anomali) > 1000:
+            st.caption(f"Menampilkan 1.000 anomali terbaru dari {len(df_anomali):,}.")
+
+        if st.button("📥 Export Anomali ke Excel"):
+            with perf.timer("tab7.export"):
+                output = io.BytesIO()
+                df_anomali.to_excel(output, sheet_name='Anomali', index=False, engine='openpyxl')
+                output.seek(0)
+                st.download_button(
+                    label="💾 Unduh Daftar Anomali",
+                    data=output,
+                    file_name=f"anomali_realisasi_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+
+    # Rows the validation stage kept out of the dataset
+    st.markdown("#### 🧪 Baris Dikarantina (Validasi Data)")
+    if backend.quarantine.empty:
+        st.success("✅ Semua baris sumber lolos validasi.")
+    else:
+        st.warning(
+            f"⚠️ {len(backend.quarantine):,} baris sumber tidak lolos validasi dan tidak ikut dihitung di dashboard."
+        )
+        st.dataframe(backend.quarantine.head(1000), use_container_width=True, hide_index=True)
+        st.download_button(
+            label="💾 Unduh Baris Karantina (CSV)",
+            data=backend.quarantine.to_csv(index=False),
+            file_name=f"karantina_realisasi_{dataset.loaded_at.strftime('%Y%m%d_%H%M')}.csv",
+            mime="text/csv"
+        )
 
 # === Footer ===
 st.markdown("---")
@@ -1028,3 +1058,35 @@ st.markdown(f"""
     </p>
 </div>
 """, unsafe_allow_html=True)
+
+# === Admin Performance Panel (?perf=1 atau REALISASI_PERF_PANEL=1) ===
+perf.record("rerun", time.perf_counter() - rerun_start)
+
+if perf.PANEL or st.query_params.get("perf") == "1":
+    with st.expander("⏱️ Performa Dashboard (per tahap, detik)"):
+        df_perf = pd.DataFrame(perf.summary())
+        st.dataframe(df_perf, use_container_width=True, hide_index=True)
+        st.download_button(
+            label="📥 Unduh Metrik (Prometheus)",
+            data=perf.prometheus_text(),
+            file_name="realisasi_metrics.prom",
+            mime="text/plain"
+        )
+        if st.button("🔬 Profil rerun berikutnya"):
+            st.session_state["profile_next"] = True
+            st.caption("Rerun berikutnya (mis. setelah mengubah filter) akan diprofil.")
+
+if profiler is not None:
+    del st.session_state["_profiler"]
+    # ?tab= is kept current by the tab tracker script above
+    report = perf.profile_save(profiler, {
+        'pilihan_jenis': pilihan_jenis,
+        'pilihan_tahun': pilihan_tahun,
+        'pilihan_triwulan': pilihan_triwulan,
+        'active_tab': st.query_params.get("tab"),
+        'backend': data_backend.BACKEND,
+        'source': data_backend.SOURCE
+    }, tag=st.session_state.setdefault("profile_tag", uuid.uuid4().hex[:8]))
+    st.caption(f"🔬 Profil rerun disimpan di {report}")
+
+perf.flush(backend=data_backend.BACKEND)
@@ -0,0 +1,221 @@
+"""Data-scale benchmark for the dashboard pipeline.
+
+Runs the same data path as ``app_dash.py`` (stage names match the
+``perf.timer`` names) on synthetic data of increasing size and records wall
+time and peak Python memory (tracemalloc; allocations inside DuckDB are not
+visible to it) per stage:
+
+    python bench/bench_pipeline.py --sizes 100k,1m,10m
+    python bench/bench_pipeline.py --save-baseline     # update bench/baseline.json
+    python bench/bench_pipeline.py --check             # exit 1 on regressions
+
+``read_excel`` and the Excel exports only run up to ``--excel-max-rows``;
+openpyxl is far too slow (and xlsx is capped at 1,048,576 rows) beyond that.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import openpyxl  # noqa: F401
+import pandas as pd
+# Imported up front so the first tab4.fit / export do not pay for them
+from sklearn.linear_model import LinearRegression
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import anomaly  # noqa: E402
+import data_backend  # noqa: E402
+import synthetic  # noqa: E402
+
+BASELINE = os.path.join(ROOT, "bench", "baseline.json")
+XLSX_MAX_ROWS = 1_048_575
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def measure(fn):
+    """Return (result, seconds, peak_mb) of ``fn()``; memory is traced in a second run."""
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak / 1e6
+
+
+def excel_bytes(*frames):
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        for name, frame in frames:
+            frame.to_excel(writer, sheet_name=name, index=False)
+    return output.getvalue()
+
+
+def run_pipeline(raw, backend_name, excel_max_rows):
+    """Yield (stage, seconds, peak_mb) for each pipeline stage on ``raw``."""
+    n_rows = len(raw)
+
+    if n_rows <= excel_max_rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "realisasi.xlsx")
+            raw.to_excel(path, index=False)
+            _, seconds, peak = measure(lambda: pd.read_excel(path))
+        yield "read_excel", seconds, peak
+
+    df, seconds, peak = measure(lambda: data_backend.preprocess(raw.copy()))
+    yield "preprocess", seconds, peak
+
+    if backend_name == "duckdb":
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot = os.path.join(tmp, "realisasi.parquet")
+            data_backend.write_snapshot(df, snapshot)
+            backend, seconds, peak = measure(lambda: data_backend.DuckDBBackend.from_source(snapshot))
+        yield "load_duckdb", seconds, peak
+    elif backend_name == "sql":
+        # Local SQLite stand-in for the realisasi database; queried in place, so it outlives this block
+        database = tempfile.TemporaryDirectory()
+        path = os.path.join(database.name, "realisasi.db")
+        data_backend.write_sqlite(raw, path)
+        backend, seconds, peak = measure(lambda: data_backend.SQLBackend.from_url(f"sqlite:///{path}"))
+        yield "load_sql", seconds, peak
+    else:
+        # As open_backend serves it: frozen, shared by every session
+        backend = data_backend.PandasBackend(data_backend.freeze(df))
+
+    tahun = max(backend.distinct('Tahun'))
+    jenis = backend.distinct('Jenis Belanja')
+    filters = {'Tahun': tahun, 'Jenis Belanja': jenis, 'Triwulan': [1, 2]}
+
+    def tab4_fit():
+        df_model = backend.aggregate(['Tahun', 'Triwulan', 'JenisEncoded'], ['Realisasi', 'Anggaran', 'Sisa Anggaran'])
+        model = LinearRegression()
+        model.fit(df_model[['Tahun', 'Triwulan', 'JenisEncoded', 'Anggaran', 'Sisa Anggaran']], df_model['Realisasi'])
+        return model
+
+    stages = [
+        ("kpi", lambda: backend.aggregate([], ['Anggaran', 'Realisasi', 'Sisa Anggaran'])),
+        ("tab1.aggregate", lambda: [backend.aggregate([c], ['Realisasi']) for c in ('Tahun', 'Jenis Belanja', 'Triwulan')]),
+        ("tab2.aggregate", lambda: backend.aggregate(['Tahun', 'Triwulan'], ['Anggaran', 'Realisasi'])),
+        ("tab3.aggregate", lambda: backend.aggregate(['Tahun', 'Triwulan', 'Jenis Belanja'], ['Realisasi'])),
+        ("tab4.fit", tab4_fit),
+        ("tab5.aggregate", lambda: backend.aggregate(['Jenis Belanja'], ['Sisa Anggaran', 'Anggaran', 'Realisasi'])),
+        ("tab6.filter", lambda: backend.select(where=filters)),
+        ("anomaly.score", lambda: anomaly.flag_backend(backend)),
+        # Built with each snapshot; every chart selection is answered from it
+        ("linked_cube", lambda: data_backend.PandasBackend(
+            backend.aggregate(['Tahun', 'Triwulan', 'Jenis Belanja'], data_backend.MONEY)
+        )),
+        ("tab2.crossfilter", lambda: results["linked_cube"].aggregate(
+            ['Jenis Belanja'], ['Anggaran', 'Realisasi'], where={'Tahun': tahun, 'Triwulan': [1, 2]}
+        )),
+    ]
+    results = {}
+    for stage, fn in stages:
+        results[stage], seconds, peak = measure(fn)
+        yield stage, seconds, peak
+
+    df_filtered = results["tab6.filter"]
+    df_performance, seconds, peak = measure(
+        lambda: df_filtered.groupby('Triwulan', observed=True)[['Anggaran', 'Realisasi', 'Sisa Anggaran']].sum().reset_index()
+    )
+    yield "tab6.aggregate", seconds, peak
+
+    # The prediction export is a handful of rows; a small aggregate has the same cost profile
+    df_pred = results["tab2.aggregate"]
+    _, seconds, peak = measure(lambda: excel_bytes(("Sheet1", df_pred)))
+    yield "tab4.export", seconds, peak
+
+    if len(df_filtered) <= min(excel_max_rows, XLSX_MAX_ROWS):
+        _, seconds, peak = measure(
+            lambda: excel_bytes(("Data_Filtered", df_filtered), ("Performance_Summary", df_performance))
+        )
+        yield "tab6.export", seconds, peak
+
+
+def check(results, baseline, tolerance, min_delta_ms, min_delta_mb):
+    failures = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            # A new stage needs its baseline committed with it; runs (backend/size)
+            # without any baseline are only reported by main()
+            if any(k.startswith(key.rsplit("/", 1)[0] + "/") for k in baseline):
+                failures.append(f"{key}: no baseline")
+            continue
+        slower = current["seconds"] - base["seconds"]
+        if slower * 1000 > min_delta_ms and current["seconds"] > base["seconds"] * (1 + tolerance):
+            failures.append(f"{key}: {base['seconds']:.3f}s -> {current['seconds']:.3f}s")
+        bigger = current["peak_mb"] - base["peak_mb"]
+        if bigger > min_delta_mb and current["peak_mb"] > base["peak_mb"] * (1 + tolerance):
+            failures.append(f"{key}: {base['peak_mb']:.1f}MB -> {current['peak_mb']:.1f}MB")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100k,1m,10m", help="comma separated row counts (k/m suffixes)")
+    parser.add_argument("--backend", choices=["pandas", "duckdb", "sql"], default="pandas")
+    parser.add_argument("--excel-max-rows", type=parse_size, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="merge results into the baseline file")
+    parser.add_argument("--check", action="store_true", help="fail on regressions against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown/growth")
+    parser.add_argument("--min-delta-ms", type=float, default=20)
+    parser.add_argument("--min-delta-mb", type=float, default=16)
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'rows':>10}  {'stage':<18}{'seconds':>10}{'peak MB':>10}")
+    for n_rows in map(parse_size, args.sizes.split(",")):
+        raw = synthetic.generate(n_rows, seed=args.seed)
+        for stage, seconds, peak in run_pipeline(raw, args.backend, args.excel_max_rows):
+            results[f"{args.backend}/{n_rows}/{stage}"] = {"seconds": round(seconds, 4), "peak_mb": round(peak, 1)}
+            print(f"{n_rows:>10}  {stage:<18}{seconds:>10.3f}{peak:>10.1f}", flush=True)
+        del raw
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.check:
+        for run in sorted({key.rsplit("/", 1)[0] for key in results}):
+            if not any(k.startswith(run + "/") for k in baseline):
+                print(f"NO BASELINE {run}")
+        failures = check(results, baseline, args.tolerance, args.min_delta_ms, args.min_delta_mb)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
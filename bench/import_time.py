@@ -0,0 +1,72 @@
+"""Import-time measurement for the dashboard startup path.
+
+Each import is timed in a fresh interpreter with ``python -X importtime``, so
+the numbers are cold-process costs. The startup path (everything the Beranda
+tab needs) must not pull in the charting or ML stacks beyond what Streamlit
+itself already imports.
+
+    python bench/import_time.py [--budget-ms 5000]
+
+Exits non-zero if the startup path exceeds the budget or imports a heavy
+module eagerly.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP = ["streamlit", "pandas", "data_backend"]
+DEFERRED = ["plotly.express", "plotly.graph_objects", "sklearn.linear_model"]
+HEAVY_PREFIXES = ("plotly", "sklearn", "scipy")
+
+
+def measure(modules):
+    """Return (total_ms, imported module names) for a cold import of ``modules``."""
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    total_us, imported = 0, []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        imported.append(name.strip())
+        # Top-level entries (no indentation) add up to the full import cost
+        if not name.startswith(" "):
+            total_us += int(cumulative)
+    return total_us / 1000, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float,
+                        help="maximum cold import time of the startup path")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'module':<24}{'ms':>10}")
+    for module in STARTUP + DEFERRED:
+        ms, _ = measure([module])
+        note = "  (deferred)" if module in DEFERRED else ""
+        print(f"{module:<24}{ms:>10.1f}{note}")
+
+    startup_ms, imported = measure(STARTUP)
+    _, streamlit_imported = measure(["streamlit"])
+    budget = f"  (budget {args.budget_ms:.0f})" if args.budget_ms else ""
+    print(f"{'startup total':<24}{startup_ms:>10.1f}{budget}")
+
+    eager = sorted(m for m in set(imported) - set(streamlit_imported) if m.startswith(HEAVY_PREFIXES))
+    if eager:
+        print(f"eager heavy imports on the startup path: {', '.join(eager[:5])}")
+        failed = True
+    if args.budget_ms and startup_ms > args.budget_ms:
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""Concurrent-session load test for the dashboard.
+
+Drives many simulated sessions through the app headlessly with Streamlit's
+AppTest, all inside this process. Like a real Streamlit server, each session
+reruns the script on its own thread and shares the process-wide caches.
+Every session follows a quarter-end style interaction script: open the
+dashboard, then repeatedly change the tab 6 year / jenis / triwulan filters
+and export the selection to Excel. Tab switches happen in the browser and
+do not rerun the script, so they cost nothing here.
+
+    python bench/load_test.py --concurrency 1,10,25 --iterations 3
+    python bench/load_test.py --rows 200k            # synthetic dataset
+
+Reports per-rerun latency percentiles, reruns/second and process RSS growth
+per concurrency level; reruns that raise or come back empty are reported as
+errors (exit status 1) and left out of the percentiles. Nothing outside this
+machine is contacted.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from streamlit.testing.v1 import AppTest, app_test
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app_dash.py")
+LOCAL_DATA = os.path.join(ROOT, "data", "RealisasiBelanja_cleaned.xlsx")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def share_runtime():
+    """Pin one mock Streamlit runtime and the app-test config for the whole process.
+
+    AppTest installs a fresh mock runtime for every run and clears it when the
+    run ends, which breaks any other session still running. A real server has
+    a single runtime shared by all sessions, so the harness does the same.
+    AppTest also patches ``config.get_option`` around every run to turn on
+    ``global.appTest``; overlapping runs restore each other's patch, and a
+    run left without it records no widgets (an empty element tree, then
+    ``KeyError`` on the next widget lookup). The option is set once instead.
+    Every AppTest run also compiles the script in its own cache, and CPython
+    3.11 can fail compiling on several threads at once ("AST constructor
+    recursion depth mismatch"); like a server, all sessions share one cache,
+    which compiles under a lock.
+    """
+    import contextlib
+    from unittest.mock import MagicMock
+
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: shared)
+    Runtime.exists = classmethod(lambda cls: True)
+
+    config.set_option("global.appTest", True)
+    app_test.patch_config_options = lambda overrides: contextlib.nullcontext()
+    script_cache = ScriptCache()
+    local_script_runner.ScriptCache = lambda: script_cache
+
+
+def rss_mb():
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        import resource
+
+        # Peak rather than current RSS off Linux (kilobytes on Linux, bytes on macOS)
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_session(seed, iterations, timeout, latencies, errors):
+    rng = random.Random(seed)
+    at = AppTest.from_file(APP, default_timeout=timeout)
+
+    def rerun(action):
+        start = time.perf_counter()
+        at.run()
+        seconds = time.perf_counter() - start
+        if at.exception:
+            errors.append(f"{action}: {at.exception[0].message}")
+        elif not at.main.children:
+            # Not a real rerun: keep it out of the percentiles
+            errors.append(f"{action}: empty element tree")
+        else:
+            latencies.append(seconds)
+
+    try:
+        rerun("open")
+        for _ in range(iterations):
+            tahun = at.selectbox(key="pilihan_tahun")
+            tahun.set_value(rng.choice(tahun.options))
+            rerun("tahun")
+
+            jenis = at.multiselect(key="pilihan_jenis")
+            jenis.set_value(rng.sample(jenis.options, rng.randint(1, len(jenis.options))))
+            rerun("jenis")
+
+            triwulan = at.multiselect(key="pilihan_triwulan")
+            if triwulan.options:
+                triwulan.set_value(rng.sample(triwulan.options, rng.randint(1, len(triwulan.options))))
+                rerun("triwulan")
+
+            export = [b for b in at.button if b.label.startswith("📥 Export")]
+            if export:
+                export[0].click()
+                rerun("export")
+    except Exception as exc:  # keep the other sessions running
+        errors.append(f"session {seed}: {exc!r}")
+
+
+def run_level(concurrency, iterations, timeout):
+    latencies, errors = [], []
+    rss_before = rss_mb()
+    threads = [
+        threading.Thread(target=run_session, args=(seed, iterations, timeout, latencies, errors))
+        for seed in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    rss_after = rss_mb()
+    return {
+        "concurrency": concurrency,
+        "reruns": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies),
+        "rss_mb": rss_after,
+        "rss_growth_mb": rss_after - rss_before,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,5,10,25", help="comma separated session counts")
+    parser.add_argument("--iterations", type=int, default=3, help="filter/export rounds per session")
+    parser.add_argument("--rows", help="use a synthetic dataset of this many rows (k/m suffixes)")
+    parser.add_argument("--timeout", type=float, default=600, help="per-rerun timeout in seconds")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    if args.rows:
+        import data_backend
+        import synthetic
+        from bench_pipeline import parse_size
+
+        snapshot = os.path.join(tmp.name, "realisasi.parquet")
+        data_backend.write_snapshot(data_backend.preprocess(synthetic.generate(parse_size(args.rows))), snapshot)
+        os.environ["REALISASI_SOURCE"] = snapshot
+        # data_backend is already imported here, so its default has to follow too
+        data_backend.SOURCE = snapshot
+    else:
+        os.environ.setdefault("REALISASI_SOURCE", LOCAL_DATA)
+
+    share_runtime()
+    print(f"{'sessions':>8}{'reruns':>8}{'rerun/s':>9}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'max s':>8}{'RSS MB':>9}{'+MB':>7}")
+    failed = False
+    for concurrency in map(int, args.concurrency.split(",")):
+        r = run_level(concurrency, args.iterations, args.timeout)
+        print(f"{r['concurrency']:>8}{r['reruns']:>8}{r['throughput']:>9.2f}{r['p50']:>8.3f}{r['p95']:>8.3f}"
+              f"{r['p99']:>8.3f}{r['max']:>8.3f}{r['rss_mb']:>9.0f}{r['rss_growth_mb']:>7.0f}", flush=True)
+        for error in r["errors"][:5]:
+            print(f"  error: {error}")
+        failed = failed or bool(r["errors"])
+    tmp.cleanup()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
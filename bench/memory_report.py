@@ -0,0 +1,102 @@
+"""Memory report for the cleaned dataset's column types.
+
+Compares the compact representation the app serves (the frozen frame of
+``data_backend.open_backend()``: int64 Rupiah, categorical dimensions, small
+integers) with the previous wide one (float64 money, int64 integers, object
+text) on synthetic data:
+
+    python bench/memory_report.py --rows 1m
+
+Prints bytes per row for every column (``memory_usage(deep=True)``, so text
+columns include their string objects), the tab groupby times on both, and
+how far float64 KPI totals drift from the exact integer ones.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import data_backend  # noqa: E402
+import synthetic  # noqa: E402
+from bench_pipeline import parse_size  # noqa: E402
+
+GROUPBYS = [
+    ['Tahun'],
+    ['Jenis Belanja'],
+    ['Tahun', 'Triwulan'],
+    ['Tahun', 'Triwulan', 'Jenis Belanja'],
+]
+
+
+def wide(df):
+    """``df`` in the float64 / int64 / object types used before."""
+    types = {}
+    for col in df.columns:
+        dtype = df[col].dtype
+        if col in data_backend.MONEY or pd.api.types.is_float_dtype(dtype):
+            types[col] = 'float64'
+        elif isinstance(dtype, pd.CategoricalDtype):
+            types[col] = 'int64' if pd.api.types.is_integer_dtype(dtype.categories) else object
+        elif pd.api.types.is_integer_dtype(dtype):
+            types[col] = 'int64'
+    return df.astype(types)
+
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=parse_size, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "realisasi.parquet")
+        synthetic.generate(args.rows, seed=args.seed).to_parquet(source, index=False)
+        data_backend.SOURCE, data_backend.BACKEND, data_backend.SHARED_DIR = source, "pandas", None
+        compact = data_backend.open_backend().df
+    before = wide(compact)
+    n = len(compact)
+
+    usage_before = before.memory_usage(deep=True, index=False)
+    usage_after = compact.memory_usage(deep=True, index=False)
+    print(f"{n:,} rows\n")
+    print(f"{'column':<22}{'before':>16}{'B/row':>7}{'after':>16}{'B/row':>7}")
+    for col in compact.columns:
+        print(f"{col:<22}{str(before[col].dtype):>16}{usage_before[col] / n:>7.1f}"
+              f"{str(compact[col].dtype):>16}{usage_after[col] / n:>7.1f}")
+    total_before, total_after = usage_before.sum() / n, usage_after.sum() / n
+    print(f"{'total':<22}{'':>16}{total_before:>7.1f}{'':>16}{total_after:>7.1f}"
+          f"   ({total_before / total_after:.1f}x smaller)\n")
+
+    print(f"{'groupby':<40}{'before ms':>10}{'after ms':>10}")
+    for by in GROUPBYS:
+        seconds = [
+            timed(lambda: frame.groupby(by, observed=True)[data_backend.MONEY].sum())
+            for frame in (before, compact)
+        ]
+        print(f"{', '.join(by):<40}{seconds[0] * 1000:>10.1f}{seconds[1] * 1000:>10.1f}")
+
+    print(f"\n{'total':<16}{'float64 sum':>26}{'int64 sum':>26}{'drift Rp':>10}")
+    for col in data_backend.MONEY:
+        approx, exact = before[col].sum(), int(compact[col].sum())
+        print(f"{col:<16}{approx:>26,.0f}{exact:>26,}{int(approx) - exact:>10,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
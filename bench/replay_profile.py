@@ -0,0 +1,59 @@
+"""Replay a profiled rerun offline.
+
+Takes the ``.json`` written next to a profile report, drives the dashboard
+headlessly (Streamlit AppTest) to the same tab 6 filter state and reruns it
+with ``?profile=1``, so a fresh report for the same slow path lands in
+``REALISASI_PROFILE_DIR``.
+
+    python bench/replay_profile.py profiles/profile_<stamp>_<tag>.json
+"""
+import argparse
+import json
+import os
+import sys
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app_dash.py")
+
+
+def replay(state, timeout=300):
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    at.run()
+
+    # Year first: it decides which quarters are selectable
+    at.selectbox(key="pilihan_tahun").set_value(state["pilihan_tahun"])
+    at.multiselect(key="pilihan_jenis").set_value(state["pilihan_jenis"])
+    at.run()
+    at.multiselect(key="pilihan_triwulan").set_value(state["pilihan_triwulan"])
+
+    at.query_params["profile"] = "1"
+    if state.get("active_tab"):
+        at.query_params["tab"] = state["active_tab"]
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return [c.value for c in at.caption if "Profil rerun disimpan" in c.value]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("state", help="filter-state JSON saved with a profile report")
+    args = parser.parse_args()
+
+    with open(args.state, encoding="utf-8") as f:
+        state = json.load(f)
+    # Replay against the same data the original rerun used
+    for key, env in (("source", "REALISASI_SOURCE"), ("backend", "REALISASI_BACKEND")):
+        if state.get(key):
+            os.environ.setdefault(env, str(state[key]))
+
+    for line in replay(state):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Synthetic realisasi belanja generator.
+
+Produces frames with the same columns and dtypes as
+``RealisasiBelanja_cleaned.xlsx`` (i.e. what ``data_backend.read_source``
+returns), at any size:
+
+* Tanggal is the quarter-end date of (Tahun, Triwulan), as in the workbook
+* Kode/Uraian/Jenis Belanja come from the real chart of accounts
+* Anggaran is log-normal per Jenis Belanja (Barang heavily skewed), growing
+  ~5% a year
+* Realisasi is the cumulative year-to-date absorption, following the real
+  quarter pattern (~17% / 40% / 61% / 90%), with a few rows over budget
+
+    python bench/synthetic.py 1000000 -o realisasi_1m.parquet
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# (Kode Belanja, Uraian Belanja, Jenis Belanja, weight)
+AKUN = [
+    (5111, "Belanja Gaji dan Tunjangan PNS", "Pegawai (51)", 3),
+    (5116, "Belanja Gaji dan Tunjangan PPPK", "Pegawai (51)", 1),
+    (5122, "Belanja Lembur", "Pegawai (51)", 2),
+    (5124, "Belanja Tunj. Khusus & Belanja Pegawai Transito", "Pegawai (51)", 1),
+    (5211, "Belanja Barang Operasional", "Barang (52)", 3),
+    (5212, "Belanja Barang Non Operasional", "Barang (52)", 3),
+    (5218, "Belanja Barang Persediaan", "Barang (52)", 2),
+    (5221, "Belanja Jasa", "Barang (52)", 2),
+    (5231, "Belanja Pemeliharaan", "Barang (52)", 2),
+    (5241, "Belanja Perjalanan Dalam Negeri", "Barang (52)", 2),
+    (5242, "Belanja Perjalanan Luar Negeri", "Barang (52)", 1),
+    (5251, "Belanja Barang BLU", "Barang (52)", 1),
+    (5311, "Belanja Modal Tanah", "Modal (53)", 1),
+    (5321, "Belanja Modal Peralatan dan Mesin", "Modal (53)", 2),
+    (5331, "Belanja Modal Gedung dan Bangunan", "Modal (53)", 2),
+    (5361, "Belanja Modal Lainnya", "Modal (53)", 1),
+    (5371, "Belanja Modal BLU", "Modal (53)", 1),
+]
+
+# Jenis Belanja -> (median Anggaran, log-normal sigma)
+ANGGARAN = {
+    "Pegawai (51)": (2.0e10, 0.9),
+    "Barang (52)": (6.0e10, 1.8),
+    "Modal (53)": (8.0e10, 1.1),
+}
+
+# Mean cumulative realisasi ratio at the end of each quarter
+SERAPAN = {1: 0.17, 2: 0.40, 3: 0.61, 4: 0.90}
+SERAPAN_CONCENTRATION = 12  # Beta(a, b) with a + b = this; lower = noisier
+
+
+def generate(n_rows, seed=0, start_year=2015, end_year=2025):
+    """Return ``n_rows`` synthetic rows in the raw workbook schema."""
+    rng = np.random.default_rng(seed)
+
+    tahun = rng.integers(start_year, end_year + 1, n_rows)
+    triwulan = rng.integers(1, 5, n_rows)
+    tanggal = pd.to_datetime({"year": tahun, "month": triwulan * 3, "day": 1}) + pd.offsets.MonthEnd(0)
+
+    weights = np.array([a[3] for a in AKUN], dtype=float)
+    akun = rng.choice(len(AKUN), n_rows, p=weights / weights.sum())
+    kode = np.array([a[0] for a in AKUN])[akun]
+    # object arrays keep one shared str per category instead of a wide unicode array
+    uraian = np.array([a[1] for a in AKUN], dtype=object)[akun]
+    jenis_values = np.array([a[2] for a in AKUN], dtype=object)
+    jenis = jenis_values[akun]
+
+    median = np.array([ANGGARAN[j][0] for j in jenis_values])[akun]
+    sigma = np.array([ANGGARAN[j][1] for j in jenis_values])[akun]
+    growth = 1.05 ** (tahun - start_year)
+    anggaran = np.round(median * growth * np.exp(sigma * rng.standard_normal(n_rows)), -3)
+
+    mean = np.array([SERAPAN[q] for q in range(1, 5)])[triwulan - 1]
+    ratio = rng.beta(mean * SERAPAN_CONCENTRATION, (1 - mean) * SERAPAN_CONCENTRATION)
+    # ~0.5% of postings overshoot the budget slightly
+    over = rng.random(n_rows) < 0.005
+    ratio[over] = 1 + rng.random(over.sum()) * 0.1
+    realisasi = np.round(anggaran * ratio)
+
+    return pd.DataFrame({
+        "Tahun": tahun,
+        "Triwulan": triwulan,
+        "Tanggal": tanggal,
+        "Kode Belanja": kode,
+        "Uraian Belanja": uraian,
+        "Jenis Belanja": jenis,
+        "Anggaran": anggaran,
+        "Realisasi": realisasi,
+        "% Realisasi Anggaran": np.round(ratio * 100, 2),
+        "Sisa Anggaran": anggaran - realisasi,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rows", type=int)
+    parser.add_argument("-o", "--output", required=True, help=".parquet, .csv or .xlsx")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    df = generate(args.rows, seed=args.seed)
+    if args.output.endswith(".parquet"):
+        df.to_parquet(args.output, index=False)
+    elif args.output.endswith(".csv"):
+        df.to_csv(args.output, index=False)
+    else:
+        df.to_excel(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,826 @@
+"""Query backend for the realisasi belanja dashboard.
+
+The dashboard asks for data only through :class:`PandasBackend` /
+:class:`DuckDBBackend`, which share the same small API (``aggregate``,
+``select``, ``distinct``, ``count``). Pandas is the default; set
+``REALISASI_BACKEND=duckdb`` to run the tab queries as SQL inside an embedded
+DuckDB database (multi-threaded, spills to disk when over ``memory_limit``),
+or ``REALISASI_BACKEND=sql`` to query a relational database at
+``REALISASI_DB_URL`` directly (:class:`SQLBackend`).
+"""
+import hashlib
+import logging
+import os
+import queue
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple
+
+import pandas as pd
+
+import anomaly
+import validation
+
+DATA_URL = "https://raw.githubusercontent.com/dinawseptiana/project-realisasi-belanja/main/data/RealisasiBelanja_cleaned.xlsx"
+
+BACKEND = os.environ.get("REALISASI_BACKEND", "pandas").lower()
+SOURCE = os.environ.get("REALISASI_SOURCE", DATA_URL)
+DUCKDB_PATH = os.environ.get("REALISASI_DUCKDB_PATH", ":memory:")
+DUCKDB_MEMORY_LIMIT = os.environ.get("REALISASI_DUCKDB_MEMORY_LIMIT")
+DUCKDB_THREADS = os.environ.get("REALISASI_DUCKDB_THREADS")
+DB_URL = os.environ.get("REALISASI_DB_URL", "sqlite:///realisasi.db")
+DB_TABLE = os.environ.get("REALISASI_DB_TABLE", "realisasi")
+DB_POOL_SIZE = int(os.environ.get("REALISASI_DB_POOL_SIZE", "5"))
+DB_FETCH_ROWS = int(os.environ.get("REALISASI_DB_FETCH_ROWS", "50000"))
+SHARED_DIR = os.environ.get("REALISASI_SHARED_DIR")
+REFRESH_SECONDS = float(os.environ.get("REALISASI_REFRESH_SECONDS", "300"))
+
+TABLE = "realisasi"
+# DuckDB tables this module creates live in their own schema, so a database
+# file shared with other data never has its tables replaced or dropped
+DUCKDB_SCHEMA = "realisasi_dashboard"
+VERSIONED_TABLE = re.compile(rf"{TABLE}_[0-9a-f]{{12}}")
+AGG_SQL = {'sum': 'SUM', 'mean': 'AVG'}
+
+# Whole Rupiah as int64: sums are exact up to ~9.2e18
+MONEY = ['Anggaran', 'Realisasi', 'Sisa Anggaran']
+TRIWULAN = pd.CategoricalDtype([1, 2, 3, 4])
+
+# Unfiltered aggregates the tabs ask for; precomputed in shared mode
+SHARED_AGGREGATES = [
+    ((), 'sum'),
+    (('Tahun',), 'sum'),
+    (('Triwulan',), 'sum'),
+    (('Jenis Belanja',), 'sum'),
+    (('Tahun', 'Triwulan'), 'sum'),
+    (('Tahun', 'Triwulan', 'Jenis Belanja'), 'sum'),
+    (('Tahun', 'Triwulan', 'JenisEncoded'), 'sum'),
+    (('JenisEncoded', 'Jenis Belanja'), 'mean'),
+]
+# Columns only prepare() adds: a Parquet file with them is a cleaned snapshot
+DERIVED = ['Sisa Anggaran', 'TriwulanAngka', 'JenisEncoded']
+SHARED_DATASET = "realisasi.arrow"
+SHARED_QUARANTINE = "quarantine.arrow"
+SHARED_ANOMALIES = "anomalies.arrow"
+# Part of every build folder's name: bump it whenever build_shared writes
+# different files or computes them differently, so old builds are not reused
+SHARED_FORMAT = 2
+
+log = logging.getLogger(__name__)
+
+
+def source_version(source=None):
+    """Cheap change marker for the source: mtime/size of a file, ETag of a URL,
+    :func:`db_fingerprint` with the SQL backend.
+
+    Returns None when it cannot be determined (e.g. the remote is unreachable).
+    """
+    if BACKEND == "sql":
+        return db_fingerprint()
+    source = str(source or SOURCE)
+    if "://" not in source:
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return None
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    import urllib.request
+
+    try:
+        with urllib.request.urlopen(urllib.request.Request(source, method="HEAD"), timeout=10) as response:
+            return response.headers.get("ETag") or response.headers.get("Last-Modified")
+    except OSError:
+        return None
+
+
+def read_source(source=None):
+    """Read the source as stored: a workbook or a Parquet file."""
+    source = source or SOURCE
+    if str(source).endswith(".parquet"):
+        return pd.read_parquet(source)
+    return pd.read_excel(source)
+
+
+def is_snapshot(source=None):
+    """True for a Parquet file written by :func:`write_snapshot` (already
+    cleaned); raw Parquet exports and workbooks are not."""
+    source = str(source or SOURCE)
+    if not source.endswith(".parquet"):
+        return False
+    import pyarrow.parquet as pq
+
+    return set(DERIVED) <= set(pq.read_schema(source).names)
+
+
+def load_source(source=None):
+    """(clean rows, quarantine) for the source, the same for every backend:
+    a snapshot is used as is, anything else goes through :func:`prepare`."""
+    if is_snapshot(source):
+        df = read_source(source)
+        # Parquet keeps string categoricals but not the integer quarter one
+        df['Triwulan'] = df['Triwulan'].astype(TRIWULAN)
+        return df, None
+    return prepare(read_source(source))
+
+
+def to_rupiah(values):
+    """Money as exact int64 whole Rupiah, from float, integer, Decimal or
+    numeric text values."""
+    if values.dtype == object:
+        # Decimal from database drivers (or digits from a TEXT column): round
+        # each value without going through float
+        return values.map(lambda v: round(Decimal(v) if isinstance(v, str) else v)).astype('int64')
+    return values.round().astype('int64')
+
+
+def prepare(df):
+    """Validate and clean a raw frame: (clean rows, quarantined rows with reasons).
+
+    Clean rows use compact, exact types: int64 Rupiah money, categorical
+    Triwulan / Jenis Belanja / Uraian Belanja and small integers elsewhere.
+    """
+    df, quarantine = validation.validate(df)
+    df['Anggaran'] = to_rupiah(df['Anggaran'])
+    df['Realisasi'] = to_rupiah(df['Realisasi'])
+    df['Sisa Anggaran'] = df['Anggaran'] - df['Realisasi']
+    df['Tahun'] = df['Tahun'].astype('int16')
+    df['TriwulanAngka'] = df['Triwulan'].astype('int8')
+    df['Triwulan'] = df['Triwulan'].astype(TRIWULAN)
+    if 'Kode Belanja' in df.columns and pd.api.types.is_integer_dtype(df['Kode Belanja']):
+        df['Kode Belanja'] = pd.to_numeric(df['Kode Belanja'], downcast='integer')
+    if 'Uraian Belanja' in df.columns:
+        df['Uraian Belanja'] = df['Uraian Belanja'].astype('category')
+
+    # Same codes as LabelEncoder (sorted categories), without importing sklearn
+    df['Jenis Belanja'] = df['Jenis Belanja'].astype('category')
+    df['JenisEncoded'] = df['Jenis Belanja'].cat.codes.astype('int8')
+
+    return df, quarantine
+
+
+def preprocess(df):
+    """The clean rows of :func:`prepare`."""
+    return prepare(df)[0]
+
+
+def freeze(df):
+    """Return ``df`` backed by read-only column arrays, one block per column.
+
+    Meant to be built once per process and shared by every session: any
+    in-place write to it raises ``ValueError: assignment destination is
+    read-only``. With pandas copy-on-write enabled, selections and
+    ``copy(deep=False)`` are zero-copy views that copy only when written.
+    Categorical columns stay categorical: their codes are frozen and the
+    (small) categories are shared.
+    """
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy(copy=True)
+            codes.flags.writeable = False
+            columns[col] = pd.Categorical.from_codes(codes, dtype=series.dtype)
+        else:
+            values = series.to_numpy(copy=True)
+            values.flags.writeable = False
+            columns[col] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def write_snapshot(df, path):
+    """Write the cleaned frame as Parquet so DuckDB can scan it directly."""
+    df.to_parquet(path, index=False)
+
+
+def write_sqlite(df, path, table=DB_TABLE):
+    """Write raw rows to a SQLite table indexed for the tab queries (a local
+    stand-in for the realisasi database)."""
+    # INTEGER money columns, so SQLite's SUM is exact
+    money = [c for c in MONEY if c in df.columns and pd.api.types.is_float_dtype(df[c])]
+    df = df.assign(**{c: df[c].round().astype('Int64') for c in money})
+    with sqlite3.connect(path) as con:
+        df.to_sql(table, con, index=False, if_exists='replace')
+        # Covering index: the tab aggregations read it without touching the table
+        con.execute(
+            f'CREATE INDEX IF NOT EXISTS "ix_{table}_periode" '
+            f'ON "{table}" ("Tahun", "Triwulan", "Jenis Belanja", "Anggaran", "Realisasi")'
+        )
+    con.close()
+
+
+def _as_list(value):
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def _no_quarantine():
+    return pd.DataFrame(columns=['Alasan'])
+
+
+def _plain(frame):
+    """``frame`` with categorical columns back as their values' dtype."""
+    categorical = [c for c in frame.columns if isinstance(frame[c].dtype, pd.CategoricalDtype)]
+    return frame.astype({c: frame[c].cat.categories.dtype for c in categorical}) if categorical else frame
+
+
+class PandasBackend:
+    """Answers dashboard queries from an in-memory DataFrame.
+
+    ``quarantine`` holds the source rows that failed validation.
+    """
+
+    def __init__(self, df, quarantine=None):
+        self.df = df
+        self.quarantine = _no_quarantine() if quarantine is None else quarantine
+
+    @property
+    def columns(self):
+        return list(self.df.columns)
+
+    def _mask(self, where):
+        mask = pd.Series(True, index=self.df.index)
+        for col, value in (where or {}).items():
+            mask &= self.df[col].isin(_as_list(value))
+        return mask
+
+    def _frame(self, where):
+        return self.df[self._mask(where)] if where else self.df
+
+    def aggregate(self, by, cols, where=None, agg='sum'):
+        frame = self._frame(where)
+        if not by:
+            return getattr(frame[cols], agg)().to_frame().T.reset_index(drop=True)
+        # Small result: plain key columns, like the SQL backends return
+        return _plain(frame.groupby(by, observed=True)[cols].agg(agg).reset_index())
+
+    def select(self, columns=None, where=None, limit=None):
+        frame = self._frame(where)
+        if columns is not None:
+            frame = frame[columns]
+        elif frame is self.df:
+            # Never hand out the shared frame object itself
+            frame = frame.copy(deep=False)
+        return frame.head(limit) if limit is not None else frame
+
+    def distinct(self, col, where=None):
+        return sorted(self._frame(where)[col].unique())
+
+    def count(self, where=None):
+        return len(self._frame(where))
+
+
+class DuckDBBackend:
+    """Answers dashboard queries with SQL against an embedded DuckDB table.
+
+    Only the (small) query results are materialised as DataFrames. Each
+    source version is loaded into its own table (in ``DUCKDB_SCHEMA``), so in
+    a database file a new snapshot never changes the table an older one is
+    still answering from; :meth:`close` drops it once that snapshot is retired.
+    """
+
+    # (database, table) of every open backend in this process
+    _open = set()
+
+    def __init__(self, con, quarantine=None, table=TABLE, database=None):
+        self.con = con
+        self.table = table
+        self.relation = f"{self.quote(DUCKDB_SCHEMA)}.{self.quote(table)}"
+        self.database = database
+        self.quarantine = _no_quarantine() if quarantine is None else quarantine
+        self.columns = [row[0] for row in con.execute(f"DESCRIBE {self.relation}").fetchall()]
+        DuckDBBackend._open.add((database, table))
+
+    @classmethod
+    def from_source(cls, source=None, database=DUCKDB_PATH, version=None):
+        import duckdb
+
+        source = source or SOURCE
+        table = f"{TABLE}_{hashlib.sha1(version.encode()).hexdigest()[:12]}" if version else TABLE
+        config = {}
+        if DUCKDB_MEMORY_LIMIT:
+            config['memory_limit'] = DUCKDB_MEMORY_LIMIT
+        if DUCKDB_THREADS:
+            config['threads'] = int(DUCKDB_THREADS)
+        con = duckdb.connect(database, config=config)
+        schema = cls.quote(DUCKDB_SCHEMA)
+        con.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+        # Versions left in a database file by earlier processes; only names this
+        # module generates, and only in its own schema
+        for (name,) in con.execute(
+            "SELECT table_name FROM duckdb_tables() WHERE database_name = current_database() AND schema_name = ?",
+            [DUCKDB_SCHEMA],
+        ).fetchall():
+            if name != table and VERSIONED_TABLE.fullmatch(name) and (database, name) not in cls._open:
+                con.execute(f"DROP TABLE IF EXISTS {schema}.{cls.quote(name)}")
+
+        quarantine = None
+        relation = f"{schema}.{cls.quote(table)}"
+        if is_snapshot(source):
+            # Already cleaned: let DuckDB scan it without pandas
+            con.execute(f"CREATE OR REPLACE TABLE {relation} AS SELECT * FROM read_parquet(?)", [str(source)])
+        else:
+            df, quarantine = load_source(source)
+            con.register("df_source", _plain(df))
+            con.execute(f"CREATE OR REPLACE TABLE {relation} AS SELECT * FROM df_source")
+            con.unregister("df_source")
+        return cls(con, quarantine, table, database)
+
+    def close(self):
+        """Drop this snapshot's table and close its connection."""
+        DuckDBBackend._open.discard((self.database, self.table))
+        try:
+            self.con.execute(f"DROP TABLE IF EXISTS {self.relation}")
+        finally:
+            self.con.close()
+
+    @staticmethod
+    def quote(col):
+        return '"' + col.replace('"', '""') + '"'
+
+    def scan(self):
+        """(relation, parameters, order columns) for a query over the whole
+        table in load order, e.g. the anomaly scoring in :mod:`anomaly`."""
+        return f"(SELECT *, rowid AS _urutan FROM {self.relation}) src", [], ['Tanggal', '_urutan']
+
+    def _where(self, where):
+        clauses, params = [], []
+        for col, value in (where or {}).items():
+            values = _as_list(value)
+            if not values:
+                clauses.append("FALSE")
+                continue
+            clauses.append(f"{self.quote(col)} IN ({', '.join('?' * len(values))})")
+            params.extend(v.item() if hasattr(v, 'item') else v for v in values)
+        sql = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return sql, params
+
+    def query(self, sql, params):
+        return self.con.cursor().execute(sql, params).df()
+
+    def _value(self, col, agg):
+        sql = f"{AGG_SQL[agg]}({self.quote(col)})"
+        if agg == 'sum' and col in MONEY:
+            # SUM(BIGINT) is a HUGEINT, which reaches pandas as float64; keep it exact
+            sql = f"CAST({sql} AS BIGINT)"
+        return sql
+
+    def aggregate(self, by, cols, where=None, agg='sum'):
+        keys = [self.quote(c) for c in by]
+        values = [f"{self._value(c, agg)} AS {self.quote(c)}" for c in cols]
+        where_sql, params = self._where(where)
+        sql = f"SELECT {', '.join(keys + values)} FROM {self.relation}{where_sql}"
+        if keys:
+            sql += f" GROUP BY {', '.join(keys)} ORDER BY {', '.join(keys)}"
+        return self.query(sql, params)
+
+    def select(self, columns=None, where=None, limit=None):
+        cols = ', '.join(self.quote(c) for c in columns) if columns else '*'
+        where_sql, params = self._where(where)
+        sql = f"SELECT {cols} FROM {self.relation}{where_sql} ORDER BY rowid"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self.query(sql, params)
+
+    def distinct(self, col, where=None):
+        where_sql, params = self._where(where)
+        sql = f"SELECT DISTINCT {self.quote(col)} FROM {self.relation}{where_sql} ORDER BY 1"
+        return self.query(sql, params).iloc[:, 0].tolist()
+
+    def count(self, where=None):
+        where_sql, params = self._where(where)
+        return self.con.cursor().execute(f"SELECT COUNT(*) FROM {self.relation}{where_sql}", params).fetchone()[0]
+
+
+class _SQLitePool:
+    """Fixed-size pool of read-only sqlite3 connections (stdlib only)."""
+
+    def __init__(self, path, size):
+        self.path = path
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+
+    @staticmethod
+    def quote(name):
+        return '"' + name.replace('"', '""') + '"'
+
+    def has_text(self, table, columns):
+        """Whether any of ``columns`` holds text: SQLite columns are not typed."""
+        checks = " OR ".join(f"typeof({self.quote(c)}) = 'text'" for c in columns)
+        with self.execute(f"SELECT 1 FROM {self.quote(table)} WHERE {checks} LIMIT 1", {}) as (_, cursor):
+            return cursor.fetchone() is not None
+
+    @staticmethod
+    def numeric(expr):
+        """SQL condition: ``expr`` holds a number; of text, only plain digits count."""
+        return (
+            f"(typeof({expr}) IN ('integer', 'real') OR (typeof({expr}) = 'text' AND {expr} GLOB '[0-9]*' "
+            f"AND {expr} NOT GLOB '*[^0-9.]*' AND {expr} NOT GLOB '*.*.*'))"
+        )
+
+    @staticmethod
+    def number(expr):
+        """``expr`` as a number (numeric text would compare as text)."""
+        return f"({expr} + 0)"
+
+    @contextmanager
+    def execute(self, sql, params):
+        """Yield (column names, cursor) on a pooled connection."""
+        with self.slots:
+            try:
+                con = self.idle.get_nowait()
+            except queue.Empty:
+                con = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            try:
+                cursor = con.execute(sql, params)
+                yield [d[0] for d in cursor.description], cursor
+            finally:
+                self.idle.put(con)
+
+
+class _EnginePool:
+    """SQLAlchemy engine with its own connection pool, for any other database."""
+
+    def __init__(self, url, size):
+        import sqlalchemy
+
+        self.text = sqlalchemy.text
+        self.engine = sqlalchemy.create_engine(url, pool_size=size, pool_pre_ping=True)
+        self.quote = self.engine.dialect.identifier_preparer.quote
+
+    @staticmethod
+    def has_text(table, columns):
+        # Typed databases: money columns are expected to be numeric
+        return False
+
+    @staticmethod
+    def number(expr):
+        return expr
+
+    @contextmanager
+    def execute(self, sql, params):
+        with self.engine.connect() as con:
+            result = con.execute(self.text(sql), params)
+            yield list(result.keys()), result
+
+
+@lru_cache(maxsize=None)
+def _pool(url, size=DB_POOL_SIZE):
+    """One pool per database URL per process, shared by sessions and refreshes."""
+    if url.startswith("sqlite:///"):
+        return _SQLitePool(url[len("sqlite:///"):], size)
+    return _EnginePool(url, size)
+
+
+def db_fingerprint(url=None, table=DB_TABLE):
+    """Cheap change marker for a database table: row count, totals, last date."""
+    pool = _pool(url or DB_URL)
+    q = pool.quote
+    sql = f"SELECT COUNT(*), SUM({q('Anggaran')}), SUM({q('Realisasi')}), MAX({q('Tanggal')}) FROM {q(table)}"
+    with pool.execute(sql, {}) as (_, cursor):
+        return repr(tuple(cursor.fetchone()))
+
+
+class SQLBackend:
+    """Answers dashboard queries with SQL on a relational database.
+
+    Aggregations run on the server with bound parameters; only their results
+    and the filtered detail rows (fetched ``DB_FETCH_ROWS`` at a time) come
+    back. The table holds the raw workbook columns (``table_columns``); Sisa
+    Anggaran, TriwulanAngka and JenisEncoded are derived in the query. SQLite works out
+    of the box (``sqlite:///path.db``); other URLs need SQLAlchemy and the
+    database's driver. Rows whose Anggaran/Realisasi is empty or not a number
+    (text in an untyped SQLite column) are skipped and listed in
+    ``quarantine``; the full row validation applies to file sources.
+    """
+
+    def __init__(self, pool, table=DB_TABLE):
+        self.pool = pool
+        self.quote = pool.quote
+        self.table = table
+        with pool.execute(f"SELECT * FROM {pool.quote(table)} WHERE 1 = 0", {}) as (columns, _):
+            self.table_columns = columns
+        self.columns = [c for c in columns if c not in DERIVED] + DERIVED
+        q = pool.quote
+        jenis = self.query(f"SELECT DISTINCT {q('Jenis Belanja')} FROM {q(table)} WHERE {q('Jenis Belanja')} IS NOT NULL", {})
+        # Same codes as preprocess(): position in the sorted Jenis Belanja values
+        self.jenis = sorted(jenis.iloc[:, 0])
+        # Roman quarters (as in the workbook) are mapped in the query, like validate() does
+        triwulan = set(self._fetch(f"SELECT DISTINCT {q('Triwulan')} FROM {q(table)}", {}).iloc[:, 0].astype(str))
+        self.roman = {k: v for k, v in validation.ROMAN.items() if k in triwulan}
+        # Only a money column holding text pays for the per-row number checks
+        self.text_money = pool.has_text(table, ['Anggaran', 'Realisasi'])
+        self.quarantine = self._quarantine()
+
+    @classmethod
+    def from_url(cls, url=None, table=DB_TABLE):
+        return cls(_pool(url or DB_URL), table)
+
+    def _fetch(self, sql, params):
+        """The rows of ``sql`` as the driver returns them."""
+        frames = []
+        with self.pool.execute(sql, params) as (columns, cursor):
+            while rows := cursor.fetchmany(DB_FETCH_ROWS):
+                frames.append(pd.DataFrame.from_records(rows, columns=columns))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+    def query(self, sql, params):
+        frame = self._fetch(sql, params)
+        # Drivers return dates as text and money as Decimal; match preprocess()
+        for col in frame.columns.intersection(MONEY):
+            if frame[col].notna().all():
+                frame[col] = to_rupiah(frame[col])
+            else:
+                frame[col] = pd.to_numeric(frame[col]).astype('float64')
+        if 'Tanggal' in frame.columns:
+            frame['Tanggal'] = pd.to_datetime(frame['Tanggal'])
+        return frame
+
+    def _numeric(self, col):
+        q = self.pool.quote
+        return self.pool.numeric(q(col)) if self.text_money else f"{q(col)} IS NOT NULL"
+
+    def _source(self):
+        """The table with the derived columns, as a subquery, and its parameters."""
+        q = self.pool.quote
+        cases = " ".join(f"WHEN :j{i} THEN {i}" for i in range(len(self.jenis)))
+        exprs = {}
+        if self.roman:
+            romans = " ".join(f"WHEN :r{i} THEN {self.roman[r]}" for i, r in enumerate(self.roman))
+            exprs['Triwulan'] = f"CASE {q('Triwulan')} {romans} ELSE {self.pool.number(q('Triwulan'))} END"
+        if self.text_money:
+            exprs.update((c, self.pool.number(q(c))) for c in ('Anggaran', 'Realisasi'))
+        columns = [f"{exprs[c]} AS {q(c)}" if c in exprs else q(c) for c in self.table_columns if c not in DERIVED]
+        triwulan = exprs.get('Triwulan', q('Triwulan'))
+        sql = (
+            f"(SELECT {', '.join(columns)}, "
+            f"{q('Anggaran')} - {q('Realisasi')} AS {q('Sisa Anggaran')}, "
+            f"{triwulan} AS {q('TriwulanAngka')}, "
+            f"CASE {q('Jenis Belanja')} {cases} ELSE -1 END AS {q('JenisEncoded')} "
+            f"FROM {q(self.table)} WHERE {self._numeric('Anggaran')} AND {self._numeric('Realisasi')}) src"
+        )
+        params = {f"j{i}": j for i, j in enumerate(self.jenis)}
+        params.update((f"r{i}", r) for i, r in enumerate(self.roman))
+        return sql, params
+
+    def scan(self):
+        """(relation, parameters, order columns) for a query over the whole
+        table in :meth:`select` order, e.g. the anomaly scoring in :mod:`anomaly`."""
+        source, params = self._source()
+        return source, params, [c for c in ('Tanggal', 'Kode Belanja') if c in self.columns]
+
+    def _where(self, where, params):
+        clauses = []
+        for col, value in (where or {}).items():
+            values = _as_list(value)
+            if not values:
+                clauses.append("1 = 0")
+                continue
+            names = [f"p{len(params) + i}" for i in range(len(values))]
+            clauses.append(f"{self.pool.quote(col)} IN ({', '.join(':' + n for n in names)})")
+            params.update((n, v.item() if hasattr(v, 'item') else v) for n, v in zip(names, values))
+        return f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    def _quarantine(self):
+        """The rows :meth:`_source` skips, with the reasons :func:`validation.validate` uses."""
+        q = self.pool.quote
+        ok = [f"CASE WHEN {self._numeric(c)} THEN 1 ELSE 0 END AS {q('_ok_' + c)}" for c in ('Anggaran', 'Realisasi')]
+        rows = self._fetch(
+            f"SELECT *, {', '.join(ok)} FROM {q(self.table)} "
+            f"WHERE NOT ({self._numeric('Anggaran')} AND {self._numeric('Realisasi')})", {}
+        )
+        checks = []
+        for col in ('Anggaran', 'Realisasi'):
+            number = rows.pop('_ok_' + col).astype(bool)
+            checks += [(rows[col].isna(), f"{col} kosong"), (rows[col].notna() & ~number, f"{col} bukan angka")]
+        reasons = [
+            "; ".join(label for (_, label), failed in zip(checks, row) if failed)
+            for row in zip(*(mask for mask, _ in checks))
+        ]
+        return rows.astype('string').assign(Alasan=reasons)
+
+    def aggregate(self, by, cols, where=None, agg='sum'):
+        q = self.pool.quote
+        source, params = self._source()
+        keys = [q(c) for c in by]
+        values = [f"{AGG_SQL[agg]}({q(c)}) AS {q(c)}" for c in cols]
+        sql = f"SELECT {', '.join(keys + values)} FROM {source}{self._where(where, params)}"
+        if keys:
+            sql += f" GROUP BY {', '.join(keys)} ORDER BY {', '.join(keys)}"
+        return self.query(sql, params)
+
+    def select(self, columns=None, where=None, limit=None):
+        q = self.pool.quote
+        source, params = self._source()
+        cols = ', '.join(q(c) for c in columns) if columns else '*'
+        order = [q(c) for c in ('Tanggal', 'Kode Belanja') if c in self.columns]
+        sql = f"SELECT {cols} FROM {source}{self._where(where, params)}"
+        if order:
+            sql += f" ORDER BY {', '.join(order)}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self.query(sql, params)
+
+    def distinct(self, col, where=None):
+        source, params = self._source()
+        sql = f"SELECT DISTINCT {self.pool.quote(col)} FROM {source}{self._where(where, params)} ORDER BY 1"
+        return self.query(sql, params).iloc[:, 0].tolist()
+
+    def count(self, where=None):
+        source, params = self._source()
+        with self.pool.execute(f"SELECT COUNT(*) FROM {source}{self._where(where, params)}", params) as (_, cursor):
+            return cursor.fetchone()[0]
+
+
+def _shared_name(by, agg):
+    return "agg_" + ("_".join(c.replace(' ', '') for c in by) or "total") + f"_{agg}.arrow"
+
+
+def _write_arrow(frame, path):
+    import pyarrow.feather as feather
+
+    # Uncompressed and a single record batch, so readers can map columns zero-copy
+    tmp = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(frame, tmp, compression='uncompressed', chunksize=max(len(frame), 1))
+    os.replace(tmp, path)
+
+
+def _read_arrow(path):
+    import pyarrow as pa
+
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def build_shared(directory, df=None, quarantine=None):
+    """Write the cleaned dataset, quarantine, flagged anomalies and tab
+    aggregates as Arrow IPC files."""
+    os.makedirs(directory, exist_ok=True)
+    if df is None:
+        df, quarantine = load_source()
+    _write_arrow(_no_quarantine() if quarantine is None else quarantine, os.path.join(directory, SHARED_QUARANTINE))
+    # Dictionary-encode text columns: one small code array per worker instead of str objects
+    text = [c for c in df.columns if df[c].dtype == object]
+    df = df.astype({c: 'category' for c in text})
+
+    backend = PandasBackend(df)
+    # Scored once per build, so workers never copy the dataset to score it
+    _write_arrow(anomaly.flag_backend(backend), os.path.join(directory, SHARED_ANOMALIES))
+    for by, agg in SHARED_AGGREGATES:
+        _write_arrow(backend.aggregate(list(by), MONEY, agg=agg), os.path.join(directory, _shared_name(by, agg)))
+    # Dataset last: its presence marks a complete build
+    _write_arrow(df, os.path.join(directory, SHARED_DATASET))
+
+
+def ensure_shared(directory, version=None):
+    """Build the shared files for ``version`` unless present; return their folder.
+
+    Each source version (and ``SHARED_FORMAT``) gets its own subfolder, so a
+    rebuild never touches files another worker still has mapped. A folder is
+    reused only when every expected file is there. Concurrent workers build
+    only once; older versions are removed afterwards (mapped files stay
+    readable).
+    """
+    key = f"{SHARED_FORMAT}:{version or ''}"
+    target = os.path.join(directory, hashlib.sha1(key.encode()).hexdigest()[:12])
+    files = [SHARED_QUARANTINE, SHARED_ANOMALIES, SHARED_DATASET] + [_shared_name(by, agg) for by, agg in SHARED_AGGREGATES]
+
+    def complete():
+        return all(os.path.exists(os.path.join(target, name)) for name in files)
+
+    if complete():
+        return target
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".build.lock"), "w") as lock:
+        try:
+            import fcntl
+
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        except ImportError:
+            pass
+        if not complete():
+            build_shared(target)
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if path != target and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+    return target
+
+
+def load_shared(directory=None, version=None):
+    """Memory-map the shared files; numeric columns are zero-copy views of the page cache."""
+    directory = ensure_shared(directory or SHARED_DIR, version)
+    aggregates = {
+        (by, agg): _read_arrow(os.path.join(directory, _shared_name(by, agg)))
+        for by, agg in SHARED_AGGREGATES
+    }
+    quarantine = _read_arrow(os.path.join(directory, SHARED_QUARANTINE))
+    anomalies = _read_arrow(os.path.join(directory, SHARED_ANOMALIES))
+    return SharedBackend(_read_arrow(os.path.join(directory, SHARED_DATASET)), aggregates, quarantine, anomalies)
+
+
+class SharedBackend(PandasBackend):
+    """PandasBackend over a memory-mapped dataset.
+
+    Unfiltered aggregates listed in ``SHARED_AGGREGATES`` come straight from
+    the precomputed tables; everything else is computed as usual.
+    ``anomalies`` holds the build's flagged rows (see :mod:`anomaly`).
+    """
+
+    def __init__(self, df, aggregates, quarantine=None, anomalies=None):
+        super().__init__(df, quarantine)
+        self.aggregates = aggregates
+        self.anomalies = anomalies
+
+    def aggregate(self, by, cols, where=None, agg='sum'):
+        table = None if where else self.aggregates.get((tuple(by), agg))
+        if table is None or not set(cols) <= set(table.columns):
+            return super().aggregate(by, cols, where=where, agg=agg)
+        # A few dozen rows; callers get their own writable copy (sklearn insists)
+        return table[list(by) + list(cols)].copy()
+
+
+def open_backend(version=None):
+    """Build the backend selected by the environment from the current source."""
+    if BACKEND == "duckdb":
+        return DuckDBBackend.from_source(version=version)
+    if BACKEND == "sql":
+        return SQLBackend.from_url()
+    if SHARED_DIR:
+        return load_shared(SHARED_DIR, version)
+    df, quarantine = load_source()
+    return PandasBackend(freeze(df), quarantine)
+
+
+class Snapshot(NamedTuple):
+    backend: object
+    version: object
+    loaded_at: datetime
+    derived: dict
+
+
+class LiveDataset:
+    """The current backend, rebuilt off the request path when the source changes.
+
+    A watcher thread polls :func:`source_version` every ``interval`` seconds
+    and, on a change, builds a complete new backend before swapping it in with
+    a single assignment. A rerun takes one :meth:`get` at its start, so
+    in-flight reruns finish on the snapshot they started with and the next
+    rerun sees the new one. A replaced backend with a ``close`` method (DuckDB)
+    is closed one poll later, once reruns that started on it have finished.
+
+    ``derive`` maps names to functions of the backend whose results (e.g.
+    anomaly scores) are computed with each snapshot, also off the request path.
+    They may keep state from one snapshot to the next: ``anomaly.LiveFlags``
+    scores only the rows a refresh added.
+    """
+
+    def __init__(self, loader=open_backend, interval=REFRESH_SECONDS, derive=None):
+        self.loader = loader
+        self.derive = derive or {}
+        self.retired = []
+        self.current = self._build(source_version())
+        if interval > 0:
+            threading.Thread(target=self._watch, args=(interval,), name="realisasi-refresh", daemon=True).start()
+
+    def get(self):
+        return self.current
+
+    def _build(self, version):
+        backend = self.loader(version)
+        derived = {name: fn(backend) for name, fn in self.derive.items()}
+        return Snapshot(backend, version, datetime.now(), derived)
+
+    def refresh(self):
+        """Swap in a new snapshot if the source changed; True when it did."""
+        self._close_retired()
+        version = source_version()
+        if version is None or version == self.current.version:
+            return False
+        start = time.perf_counter()
+        previous, self.current = self.current, self._build(version)
+        if hasattr(previous.backend, 'close'):
+            self.retired.append(previous.backend)
+        log.info("dataset refreshed to %s in %.1fs", version, time.perf_counter() - start)
+        return True
+
+    def _close_retired(self):
+        while self.retired:
+            try:
+                self.retired.pop().close()
+            except Exception:
+                log.exception("closing a retired snapshot failed")
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
+            except Exception:  # keep serving the old snapshot; retry next poll
+                log.exception("dataset refresh failed")
@@ -0,0 +1,76 @@
+"""Run several dashboard workers that share one memory-mapped dataset.
+
+Builds the shared Arrow files once (see ``data_backend.build_shared``), then
+starts N ``streamlit run`` processes on consecutive ports with
+``REALISASI_SHARED_DIR`` set. Every worker maps the same files, so the data
+sits in the page cache once however many workers run, and a (re)started
+worker does not download or parse the workbook again. Put a reverse proxy
+with sticky sessions in front (``deploy/nginx.conf``):
+
+    python deploy/run_workers.py --workers 4 --port 8501
+    python deploy/run_workers.py --rebuild         # drop all shared files first
+
+Workers pick up a changed source by themselves (``REALISASI_REFRESH_SECONDS``).
+"""
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app_dash.py")
+sys.path.insert(0, ROOT)
+
+import data_backend  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=8501, help="port of the first worker")
+    parser.add_argument("--shared-dir", default=data_backend.SHARED_DIR or os.path.join(ROOT, "shared"))
+    parser.add_argument("--rebuild", action="store_true", help="delete the shared folder before building")
+    args = parser.parse_args()
+
+    shared_dir = os.path.abspath(args.shared_dir)
+    if args.rebuild and os.path.exists(shared_dir):
+        shutil.rmtree(shared_dir)
+    start = time.perf_counter()
+    target = data_backend.ensure_shared(shared_dir, data_backend.source_version())
+    print(f"shared dataset ready in {target} ({time.perf_counter() - start:.1f}s)", flush=True)
+
+    env = dict(os.environ, REALISASI_SHARED_DIR=shared_dir)
+    workers = []
+    for i in range(args.workers):
+        port = args.port + i
+        workers.append(subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", APP,
+             "--server.port", str(port), "--server.headless", "true"],
+            # Per-worker metrics label and Prometheus file (see perf.py)
+            cwd=ROOT, env=dict(env, REALISASI_WORKER=str(port)),
+        ))
+        print(f"worker {i} on port {port} (pid {workers[-1].pid})", flush=True)
+
+    def stop(*_):
+        for worker in workers:
+            worker.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        # One worker exiting takes the group down, so a supervisor can restart it
+        while all(worker.poll() is None for worker in workers):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop()
+        for worker in workers:
+            worker.wait()
+    return max((worker.returncode or 0) for worker in workers)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
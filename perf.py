@@ -0,0 +1,197 @@
+"""Rerun stage timers for the dashboard.
+
+``timer(name)`` records how long a stage took in a process-wide registry that
+keeps the last ``REALISASI_METRICS_WINDOW`` samples per stage. ``flush()`` is
+called once per rerun (at the end of a full one, or by the fragment of a
+fragment-only one) and exports the new samples:
+
+* ``REALISASI_METRICS_JSONL`` - append one JSON line per timed stage
+* ``REALISASI_METRICS_PROM`` - rewrite a Prometheus text file (p50/p95, sum,
+  count per stage), e.g. for the node_exporter textfile collector
+
+Both carry a ``worker`` label: ``REALISASI_WORKER`` (set per port by
+``deploy/run_workers.py``) or the process id. With ``REALISASI_WORKER`` set,
+each worker writes its own Prometheus file (``realisasi.8501.prom`` for
+``realisasi.prom``) instead of overwriting a shared one.
+
+``profile_start`` / ``profile_save`` wrap a single rerun in a sampling
+profiler (pyinstrument, falling back to cProfile) and store the report next
+to the filter state that produced it, under ``REALISASI_PROFILE_DIR``.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+METRICS_JSONL = os.environ.get("REALISASI_METRICS_JSONL")
+METRICS_PROM = os.environ.get("REALISASI_METRICS_PROM")
+WINDOW = int(os.environ.get("REALISASI_METRICS_WINDOW", "1000"))
+PANEL = os.environ.get("REALISASI_PERF_PANEL") == "1"
+PROFILE_DIR = os.environ.get("REALISASI_PROFILE_DIR", "profiles")
+WORKER = os.environ.get("REALISASI_WORKER") or str(os.getpid())
+
+QUANTILES = (0.5, 0.95)
+
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=WINDOW))
+_count = defaultdict(int)
+_sum = defaultdict(float)
+_pending = []
+
+
+def record(stage, seconds):
+    with _lock:
+        _samples[stage].append(seconds)
+        _count[stage] += 1
+        _sum[stage] += seconds
+        _pending.append({"ts": time.time(), "stage": stage, "seconds": seconds})
+
+
+@contextmanager
+def timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def _quantile(sorted_values, q):
+    # Nearest-rank percentile; exact enough for latency reporting
+    index = max(0, min(len(sorted_values) - 1, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summary():
+    """Per-stage count, p50, p95 and last duration (seconds), slowest p95 first."""
+    with _lock:
+        snapshot = {stage: list(values) for stage, values in _samples.items()}
+        counts = dict(_count)
+    rows = []
+    for stage, values in snapshot.items():
+        ordered = sorted(values)
+        rows.append({
+            "stage": stage,
+            "count": counts[stage],
+            "p50": _quantile(ordered, 0.5),
+            "p95": _quantile(ordered, 0.95),
+            "last": values[-1],
+        })
+    return sorted(rows, key=lambda row: row["p95"], reverse=True)
+
+
+def _escape(label):
+    return label.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def prometheus_path():
+    """The Prometheus file this process writes: one per worker when ``REALISASI_WORKER`` is set."""
+    if not METRICS_PROM or not os.environ.get("REALISASI_WORKER"):
+        return METRICS_PROM
+    root, ext = os.path.splitext(METRICS_PROM)
+    return f"{root}.{WORKER}{ext}"
+
+
+def prometheus_text():
+    with _lock:
+        snapshot = {stage: sorted(values) for stage, values in _samples.items()}
+        counts, sums = dict(_count), dict(_sum)
+    lines = [
+        "# HELP realisasi_stage_seconds Duration of dashboard rerun stages.",
+        "# TYPE realisasi_stage_seconds summary",
+    ]
+    worker = _escape(WORKER)
+    for stage in sorted(snapshot):
+        labels = f'worker="{worker}",stage="{_escape(stage)}"'
+        for q in QUANTILES:
+            lines.append(f'realisasi_stage_seconds{{{labels},quantile="{q}"}} {_quantile(snapshot[stage], q):.6f}')
+        lines.append(f'realisasi_stage_seconds_sum{{{labels}}} {sums[stage]:.6f}')
+        lines.append(f'realisasi_stage_seconds_count{{{labels}}} {counts[stage]}')
+    return "\n".join(lines) + "\n"
+
+
+def flush(**labels):
+    """Export samples recorded since the last flush; ``labels`` go into each JSON line."""
+    with _lock:
+        events = _pending[:]
+        _pending.clear()
+
+    if METRICS_JSONL and events:
+        labels = {"worker": WORKER, **labels}
+        # One append per flush rather than per line: workers may share the file
+        with open(METRICS_JSONL, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps({**event, **labels}) + "\n" for event in events))
+
+    if METRICS_PROM:
+        # Write then rename so a scraper never reads a half-written file
+        path = prometheus_path()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(prometheus_text())
+        os.replace(tmp, path)
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _count.clear()
+        _sum.clear()
+        _pending.clear()
+
+
+def profile_start():
+    """Start a sampling profiler for the current rerun."""
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    profiler = Profiler(interval=0.001)
+    profiler.start()
+    return profiler
+
+
+def profile_discard(profiler):
+    """Stop ``profiler`` without a report, e.g. one left by an interrupted rerun."""
+    if hasattr(profiler, "output_html"):
+        if profiler.is_running:
+            try:
+                profiler.stop()
+            except RuntimeError:
+                pass  # started on a script thread that has since ended, and its sampling with it
+    else:
+        profiler.disable()
+
+
+def _jsonable(value):
+    # numpy scalars from the filter widgets
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def profile_save(profiler, state, tag="session"):
+    """Stop ``profiler``; write the report (HTML, or .prof for cProfile) and ``state`` as JSON.
+
+    Returns the report path.
+    """
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%d_%H%M%S") + f"_{int(time.time() * 1000) % 1000:03d}"
+    base = os.path.join(PROFILE_DIR, f"profile_{stamp}_{tag}")
+
+    if hasattr(profiler, "output_html"):
+        profiler.stop()
+        report = base + ".html"
+        with open(report, "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+    else:
+        profiler.disable()
+        report = base + ".prof"
+        profiler.dump_stats(report)
+
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump({**state, "report": os.path.basename(report)}, f, indent=2, default=_jsonable)
+    return report
@@ -0,0 +1,212 @@
+"""Validation, anomaly scoring and the query backends agree with each other.
+
+    python -m pytest tests
+
+The backend checks load one synthetic dataset into every backend (DuckDB
+only when it is installed) and compare their answers with the pandas one.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+import anomaly  # noqa: E402
+import data_backend  # noqa: E402
+import synthetic  # noqa: E402
+import validation  # noqa: E402
+
+ROW_KEY = ['Tanggal', 'Kode Belanja', 'Anggaran', 'Realisasi']
+
+
+def raw(*rows):
+    """Raw workbook rows from (Tanggal, Kode Belanja, Jenis Belanja, Anggaran, Realisasi)."""
+    df = pd.DataFrame(rows, columns=['Tanggal', 'Kode Belanja', 'Jenis Belanja', 'Anggaran', 'Realisasi'])
+    tanggal = pd.to_datetime(df['Tanggal'], format='%Y-%m-%d', errors='coerce')
+    df.insert(0, 'Tahun', tanggal.dt.year.fillna(2024).astype(int))
+    df.insert(1, 'Triwulan', tanggal.dt.quarter.fillna(1).astype(int))
+    return df
+
+
+def reasons(quarantine):
+    return quarantine['Alasan'].tolist()
+
+
+# === validate ===
+
+def test_text_amounts_parse_thousands_and_sen():
+    df = raw(
+        ('2024-03-31', 5111, 'Pegawai (51)', '1,234,567', '1,234.5'),
+        ('2024-03-31', 5211, 'Barang (52)', '21,276,070,424,00', '21,198,274,724,57'),
+        ('2024-03-31', 5311, 'Modal (53)', 1000, ' 250 '),
+    )
+    valid, quarantine = validation.validate(df)
+    assert quarantine.empty
+    assert valid['Anggaran'].tolist() == [1234567, 21276070424, 1000]
+    assert valid['Realisasi'].tolist() == [1234.5, 21198274724.57, 250]
+
+
+@pytest.mark.parametrize("amount", ['12,34,567', '1,2345', '1.234,56', 'abc', '1,234,567,8'])
+def test_malformed_amounts_are_quarantined_not_inflated(amount):
+    valid, quarantine = validation.validate(raw(('2024-03-31', 5111, 'Pegawai (51)', amount, 100)))
+    assert valid.empty
+    assert reasons(quarantine) == ["Anggaran bukan angka"]
+
+
+def test_missing_and_negative_amounts():
+    _, quarantine = validation.validate(raw(
+        ('2024-03-31', 5111, 'Pegawai (51)', None, 100),
+        ('2024-03-31', 5112, 'Pegawai (51)', 100, -1),
+    ))
+    assert reasons(quarantine) == ["Anggaran kosong", "Nilai negatif"]
+
+
+@pytest.mark.filterwarnings("ignore:Could not infer format")
+def test_bad_and_inconsistent_dates():
+    df = raw(
+        ('bukan tanggal', 5111, 'Pegawai (51)', 100, 50),
+        ('2024-03-31', 5112, 'Pegawai (51)', 100, 50),
+        ('2024-06-30', 5113, 'Pegawai (51)', 100, 50),
+    )
+    df['Triwulan'] = df['Triwulan'].astype(object)
+    df.loc[1, 'Triwulan'] = 'II'
+    df.loc[2, 'Tahun'] = 2023
+    _, quarantine = validation.validate(df)
+    assert reasons(quarantine) == ["Tanggal tidak valid", "Triwulan tidak sesuai Tanggal", "Tahun tidak sesuai Tanggal"]
+
+
+def test_roman_quarters_and_unknown_jenis():
+    df = raw(('2024-09-30', 5211, 'Barang (52)', 100, 50), ('2024-09-30', 5911, 'Lainnya (59)', 100, 50))
+    df['Triwulan'] = ['III', 'III']
+    valid, quarantine = validation.validate(df)
+    assert valid['Triwulan'].tolist() == [3]
+    assert reasons(quarantine) == ["Jenis Belanja tidak dikenal"]
+
+
+def test_over_budget_rows_are_kept_and_flagged():
+    valid, quarantine = validation.validate(raw(('2024-03-31', 5111, 'Pegawai (51)', 100, 500)))
+    assert quarantine.empty
+    assert anomaly.score_frame(valid)['Alasan'].tolist() == [anomaly.OVER_BUDGET]
+
+
+def test_repeated_postings_keep_the_first():
+    rows = [
+        ('2024-03-31', 5111, 'Pegawai (51)', 100, 50),
+        ('2024-03-31', 5111, 'Pegawai (51)', 100, 50),
+        ('2024-03-31', 5122, 'Pegawai (51)', 100, 50),
+    ]
+    valid, quarantine = validation.validate(raw(*rows))
+    assert valid['Kode Belanja'].tolist() == [5111, 5122]
+    assert reasons(quarantine) == ["Duplikat posting"]
+
+    # Without Kode Belanja the jenis identifies the posting
+    valid, quarantine = validation.validate(raw(*rows).drop(columns='Kode Belanja'))
+    assert len(valid) == 1
+    assert reasons(quarantine) == ["Duplikat posting", "Duplikat posting"]
+
+
+# === anomaly scoring ===
+
+@pytest.fixture(scope="module")
+def raw_rows():
+    return synthetic.generate(4000, seed=1)
+
+
+@pytest.fixture(scope="module")
+def clean(raw_rows):
+    return data_backend.prepare(raw_rows)[0]
+
+
+def stream(detector, df):
+    records = df[anomaly.KEY + ['Tanggal', 'Anggaran', 'Realisasi']].to_dict('records')
+    return pd.DataFrame([detector.score(record) for record in records], index=df.index)
+
+
+def assert_same_scores(actual, expected):
+    assert actual['Anomali'].tolist() == expected['Anomali'].tolist()
+    assert actual['Alasan'].tolist() == expected['Alasan'].tolist()
+    np.testing.assert_allclose(actual['Z-Score'], expected['Z-Score'], rtol=1e-9)
+
+
+def test_score_frame_matches_streaming_detector(clean):
+    ordered = clean.sort_values('Tanggal', kind='stable')
+    scores = anomaly.score_frame(clean).loc[ordered.index]
+    assert scores['Anomali'].any()
+    assert_same_scores(stream(anomaly.AnomalyDetector(), ordered), scores)
+
+
+def test_detector_seeded_from_history_continues_the_batch(clean):
+    dates = np.sort(clean['Tanggal'].unique())
+    cut = dates[len(dates) // 2]
+    rest = clean[clean['Tanggal'] > cut].sort_values('Tanggal', kind='stable')
+    detector = anomaly.AnomalyDetector.from_history(clean[clean['Tanggal'] <= cut])
+    assert_same_scores(stream(detector, rest), anomaly.score_frame(clean).loc[rest.index])
+
+
+def test_scores_do_not_depend_on_row_order(clean):
+    shuffled = clean.sample(frac=1, random_state=0)
+    assert_same_scores(anomaly.score_frame(shuffled).loc[clean.index], anomaly.score_frame(clean))
+
+
+def test_live_flags_refresh_matches_batch(clean):
+    dates = np.sort(clean['Tanggal'].unique())
+    flags = anomaly.LiveFlags()
+    flags(data_backend.PandasBackend(clean[clean['Tanggal'] <= dates[-5]]))
+    refreshed = flags(data_backend.PandasBackend(clean))
+    assert sorted_rows(refreshed) == sorted_rows(anomaly.flagged(clean))
+
+
+# === backend parity ===
+
+def sorted_rows(df, columns=ROW_KEY + ['Jenis Belanja']):
+    return sorted(df[columns].astype(str).itertuples(index=False))
+
+
+@pytest.fixture(scope="module", params=["duckdb", "sql"])
+def backend(request, raw_rows, tmp_path_factory):
+    tmp = tmp_path_factory.mktemp(request.param)
+    if request.param == "duckdb":
+        pytest.importorskip("duckdb")
+        source = tmp / "realisasi.parquet"
+        raw_rows.to_parquet(source, index=False)
+        backend = data_backend.DuckDBBackend.from_source(str(source))
+        yield backend
+        backend.close()
+    else:
+        path = tmp / "realisasi.db"
+        data_backend.write_sqlite(raw_rows, str(path))
+        yield data_backend.SQLBackend.from_url(f"sqlite:///{path}")
+
+
+@pytest.fixture(scope="module")
+def reference(clean):
+    return data_backend.PandasBackend(data_backend.freeze(clean))
+
+
+@pytest.mark.parametrize("by", [[], ['Tahun'], ['Tahun', 'Triwulan', 'Jenis Belanja'], ['JenisEncoded']])
+def test_backends_aggregate_alike(backend, reference, by):
+    expected = reference.aggregate(by, data_backend.MONEY)
+    actual = backend.aggregate(by, data_backend.MONEY)
+    assert actual[by].astype(str).values.tolist() == expected[by].astype(str).values.tolist()
+    for col in data_backend.MONEY:
+        assert actual[col].astype('int64').tolist() == expected[col].astype('int64').tolist()
+
+
+def test_backends_filter_alike(backend, reference):
+    where = {'Tahun': 2020, 'Triwulan': [2, 4], 'Jenis Belanja': ['Barang (52)']}
+    expected = reference.select(where=where)
+    assert backend.count(where) == len(expected)
+    assert sorted_rows(backend.select(where=where)) == sorted_rows(expected)
+    assert backend.distinct('Triwulan', where={'Tahun': 2020}) == reference.distinct('Triwulan', where={'Tahun': 2020})
+
+
+def test_backends_flag_the_same_anomalies(backend, reference):
+    expected = anomaly.flag_backend(reference)
+    actual = anomaly.flag_backend(backend)
+    assert len(expected)
+    assert sorted_rows(actual, ROW_KEY + ['Alasan']) == sorted_rows(expected, ROW_KEY + ['Alasan'])
@@ -0,0 +1,150 @@
+"""Row validation for the realisasi workbook.
+
+:func:`validate` checks a raw frame in one vectorised pass and splits it into
+rows the dashboard can use (with parsed numeric/date columns) and a
+quarantine of the rest, each with the reasons it was rejected. Nothing is
+dropped silently and a bad cell never raises.
+
+Checks per row:
+
+* Anggaran / Realisasi present and numeric, not negative. Text may group
+  thousands with commas (``1,234,567`` or ``1,234,567.89``) and end in a
+  two-digit sen part after a comma (``1,234,567,89``); any other comma
+  makes the value "bukan angka" rather than a number 100x too large
+* Tanggal parseable; Tahun and Triwulan (1-4 or I-IV) consistent with it
+* Jenis Belanja one of ``JENIS_BELANJA``; Kode Belanja (when the column
+  exists) present, numeric and under that jenis' account prefix
+* not a repeat of an earlier posting (same Tanggal, Kode Belanja, Anggaran
+  and Realisasi; Jenis Belanja in place of Kode Belanja when that column is
+  absent); the first one is kept
+
+Realisasi above Anggaran is a spending anomaly, not a malformed row: it is
+kept and flagged by :mod:`anomaly`.
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+JENIS_BELANJA = os.environ.get("REALISASI_JENIS_BELANJA", "Pegawai (51),Barang (52),Modal (53)").split(",")
+
+REQUIRED = ['Tahun', 'Triwulan', 'Tanggal', 'Jenis Belanja', 'Anggaran', 'Realisasi']
+KEY = ['Tanggal', 'Kode Belanja', 'Anggaran', 'Realisasi']
+# Without Kode Belanja a posting is identified by its jenis
+FALLBACK_KEY = ['Tanggal', 'Jenis Belanja', 'Anggaran', 'Realisasi']
+ROMAN = {'I': 1, 'II': 2, 'III': 3, 'IV': 4}
+GROUPED = r"-?\d{1,3}(?:,\d{3})*(?:\.\d+)?"
+GROUPED_SEN = r"-?\d{1,3}(?:,\d{3})*,\d{2}"
+
+
+def _to_number(values):
+    """Numeric parse; NaN where a present value is not a number."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype('float64')
+    number = pd.to_numeric(values, errors='coerce')
+    # Only the leftovers pay for string handling (thousands separators, sen)
+    retry = number.isna() & values.notna()
+    if retry.any():
+        text = values[retry].astype(str).str.strip()
+        sen = text.str.fullmatch(GROUPED_SEN)
+        known = text.str.fullmatch(GROUPED) | sen
+        text = text.where(~sen, text.str.replace(r",(\d{2})$", r".\1", regex=True))
+        number = number.astype('float64')
+        number[retry] = pd.to_numeric(text.str.replace(",", "", regex=False), errors='coerce').where(known)
+    return number.astype('float64')
+
+
+def _to_datetime(values):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values, errors='coerce')
+
+
+def _jenis_prefix(jenis):
+    """'Barang (52)' -> 52."""
+    match = re.search(r"\((\d+)\)\s*$", str(jenis))
+    return int(match.group(1)) if match else np.nan
+
+
+def _account_prefix(kode):
+    """Leading two digits of an account code (5211 -> 52, 521111 -> 52)."""
+    kode = kode.where(kode > 0)
+    digits = np.floor(np.log10(kode))
+    return np.floor(kode / 10 ** (digits - 1))
+
+
+def validate(df):
+    """Split ``df`` into (valid rows, quarantined rows with an 'Alasan' column).
+
+    Valid rows have float Anggaran/Realisasi, datetime Tanggal and integer
+    Tahun/Triwulan; quarantined rows keep their original values, as text.
+    """
+    missing = [c for c in REQUIRED if c not in df.columns]
+    if missing:
+        raise ValueError(f"kolom wajib tidak ada: {', '.join(missing)}")
+
+    anggaran = _to_number(df['Anggaran'])
+    realisasi = _to_number(df['Realisasi'])
+    tanggal = _to_datetime(df['Tanggal'])
+    triwulan = df['Triwulan']
+    if not pd.api.types.is_numeric_dtype(triwulan):
+        # map, not replace: replace on object columns downcasts with a FutureWarning
+        triwulan = pd.to_numeric(triwulan, errors='coerce').fillna(triwulan.map(ROMAN))
+    tahun = pd.to_numeric(df['Tahun'], errors='coerce')
+    # Year/quarter from month numbers: cheaper than the .dt accessors
+    months = tanggal.to_numpy().astype('datetime64[M]').astype('int64')
+    tanggal_tahun, tanggal_triwulan = months // 12 + 1970, months % 12 // 3 + 1
+    triwulan_ok = triwulan.isin([1, 2, 3, 4])
+    # Index into JENIS_BELANJA, -1 when unknown: one pass over the text column
+    jenis = pd.Categorical(df['Jenis Belanja'], categories=JENIS_BELANJA).codes
+
+    checks = [
+        (df['Anggaran'].isna(), "Anggaran kosong"),
+        (df['Anggaran'].notna() & anggaran.isna(), "Anggaran bukan angka"),
+        (df['Realisasi'].isna(), "Realisasi kosong"),
+        (df['Realisasi'].notna() & realisasi.isna(), "Realisasi bukan angka"),
+        ((anggaran < 0) | (realisasi < 0), "Nilai negatif"),
+        (tanggal.isna(), "Tanggal tidak valid"),
+        (~triwulan_ok, "Triwulan tidak valid"),
+        (tanggal.notna() & triwulan_ok & (triwulan != tanggal_triwulan), "Triwulan tidak sesuai Tanggal"),
+        (tanggal.notna() & (tahun != tanggal_tahun), "Tahun tidak sesuai Tanggal"),
+        (jenis < 0, "Jenis Belanja tidak dikenal"),
+    ]
+    if 'Kode Belanja' in df.columns:
+        kode = pd.to_numeric(df['Kode Belanja'], errors='coerce')
+        prefixes = np.array([_jenis_prefix(j) for j in JENIS_BELANJA] + [np.nan], dtype='float64')
+        expected = prefixes[jenis]  # -1 picks the trailing NaN
+        checks += [
+            (df['Kode Belanja'].isna(), "Kode Belanja kosong"),
+            (df['Kode Belanja'].notna() & kode.isna(), "Kode Belanja bukan angka"),
+            (kode.notna() & ~np.isnan(expected) & (_account_prefix(kode) != expected),
+             "Kode Belanja tidak sesuai Jenis Belanja"),
+        ]
+        key = pd.DataFrame({'Tanggal': tanggal, 'Kode Belanja': kode, 'Anggaran': anggaran, 'Realisasi': realisasi})[KEY]
+    else:
+        # Category codes stand in for the text; -1 (unknown) is left out like a missing Kode
+        jenis_code = pd.Series(jenis, index=df.index).where(jenis >= 0)
+        key = pd.DataFrame({'Tanggal': tanggal, 'Jenis Belanja': jenis_code, 'Anggaran': anggaran, 'Realisasi': realisasi})[FALLBACK_KEY]
+    # One 64-bit hash per row deduplicates far faster than four float columns
+    duplicate = pd.Series(pd.util.hash_pandas_object(key, index=False)).duplicated()
+    checks.append((duplicate & key.notna().all(axis=1), "Duplikat posting"))
+
+    masks = np.column_stack([np.asarray(mask, dtype=bool) for mask, _ in checks])
+    bad = masks.any(axis=1)
+
+    # Whole columns are replaced below, so a shallow copy is enough when nothing failed
+    valid = df.loc[~bad].copy() if bad.any() else df.copy(deep=False)
+    valid['Anggaran'] = anggaran[~bad]
+    valid['Realisasi'] = realisasi[~bad]
+    valid['Tanggal'] = tanggal[~bad]
+    valid['Triwulan'] = triwulan[~bad].astype('int64')
+    valid['Tahun'] = tahun[~bad].astype('int64')
+
+    # One reason string per distinct combination of failed checks
+    labels = np.array([label for _, label in checks], dtype=object)
+    patterns, which = np.unique(masks[bad], axis=0, return_inverse=True)
+    reasons = np.array(["; ".join(labels[row]) for row in patterns], dtype=object)
+    quarantine = df.loc[bad].astype('string')
+    quarantine['Alasan'] = reasons[which.reshape(-1)] if len(which) else []
+    return valid, quarantine.reset_index(drop=True)